@@ -1,8 +1,9 @@
+import os
 import sys
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
-from fastapi import FastAPI, Query
+from fastapi import Body, FastAPI, Query
 from fastapi.responses import JSONResponse
 
 # -------------------------------
@@ -19,8 +20,14 @@ if str(SRC_DIR) not in sys.path:
 from src.rightmove_scraper.url_scraper import fetch_property_summary
 from src.rightmove_scraper.address_search import (
     find_listing_url_with_fallback,
+    find_listing_urls_bulk,
+    resolve_address,
     autocomplete_address
 )
+from src.rightmove_scraper.deadline import Deadline
+from src.rightmove_scraper.egress import EgressPool, get_egress_pool, set_egress_pool
+from src.rightmove_scraper.revalidation import get_validator_cache
+from src.rightmove_scraper.listing_index import get_listing_index
 
 # -------------------------------
 # FASTAPI CONFIG
@@ -31,6 +38,14 @@ app = FastAPI(
     description="API service for Rightmove property scraping and search."
 )
 
+# EGRESS_PROXIES="http://p1:8080,http://p2:8080" → tüm istekler proxy havuzundan çıkar
+_proxies = [p.strip() for p in os.environ.get("EGRESS_PROXIES", "").split(",") if p.strip()]
+if _proxies:
+    set_egress_pool(EgressPool.from_proxies(_proxies))
+
+# /resolve?budget=...: adres çözümünden sonra özet çekimi için ayrılan süre (saniye)
+SUMMARY_RESERVE_S = 4.0
+
 # -------------------------------
 # 0) HEALTH CHECK
 # -------------------------------
@@ -42,6 +57,38 @@ def health():
         "status": "running"
     }
 
+# -------------------------------
+# 0b) /egress (route health)
+# -------------------------------
+@app.get("/egress")
+def egress():
+    """
+    Per-route latency, success rate, ban count and cooldown of the egress pool.
+    """
+    pool = get_egress_pool()
+    return {
+        "ok": True,
+        "enabled": pool is not None,
+        "routes": pool.stats() if pool else []
+    }
+
+# -------------------------------
+# 0c) /revalidation (conditional request hit rates)
+# -------------------------------
+@app.get("/revalidation")
+def revalidation():
+    """
+    ETag/Last-Modified revalidation stats per page kind (listing, search):
+    hit = 304 served from the stored result, miss = conditional request returned 200,
+    uncached = no validators were stored yet.
+    """
+    cache = get_validator_cache()
+    return {
+        "ok": True,
+        "enabled": cache is not None,
+        "stats": cache.stats() if cache is not None else {}
+    }
+
 # -------------------------------
 # 1) /autocomplete
 # -------------------------------
@@ -88,12 +135,15 @@ def listing_url(address: str = Query(..., min_length=2)):
 # 3) /summary
 # -------------------------------
 @app.get("/summary")
-def summary(url: str = Query(..., description="Rightmove property URL")):
+def summary(
+    url: str = Query(..., description="Rightmove property URL"),
+    stream: bool = Query(False, description="Stop downloading once the embedded state is received")
+):
     """
     Returns key property details scraped from the listing URL.
     """
     try:
-        data = fetch_property_summary(url)
+        data = fetch_property_summary(url, stream=stream)
         payload = {
             "ok": True,
             "input": {"url": url},
@@ -115,45 +165,88 @@ def summary(url: str = Query(..., description="Rightmove property URL")):
                 "key_features": data.get("key_features")
             }
         }
+        if "transfer" in data:
+            payload["data"]["transfer"] = data["transfer"]
+        if data.get("revalidated"):
+            payload["data"]["revalidated"] = True
         return JSONResponse(status_code=200, content=payload)
     except Exception as e:
         return JSONResponse(status_code=500, content={"ok": False, "error": str(e)})
 
+# -------------------------------
+# HELPERS
+# -------------------------------
+def _timing(deadline: Optional[Deadline]) -> Optional[dict]:
+    if deadline is None:
+        return None
+    return {"budget_s": deadline.budget, "elapsed_s": round(deadline.elapsed(), 3)}
+
+
 # -------------------------------
 # 4) /resolve  (1 endpoint → full workflow)
 # -------------------------------
 @app.get("/resolve")
 def resolve(
     address: Optional[str] = Query(None, description="Full or partial address"),
-    url: Optional[str] = Query(None, description="Rightmove property URL")
+    url: Optional[str] = Query(None, description="Rightmove property URL"),
+    budget: Optional[float] = Query(None, gt=0, le=120, description="Total time budget in seconds")
 ):
     """
     If URL is provided → returns summary
     If address is provided → finds URL + returns summary
+    If budget is provided → every step is sized to the remaining time; when it runs out
+    the response carries status 'deadline_exceeded', the stage it stopped at and whatever
+    was resolved so far.
     """
     try:
+        deadline = Deadline(budget) if budget else None
+
         if url:
-            data = fetch_property_summary(url)
+            data = fetch_property_summary(url, deadline=deadline)
             return JSONResponse(
                 status_code=200,
                 content={
                     "ok": True,
                     "mode": "url",
+                    "status": "deadline_exceeded" if data.get("status") == "error_deadline" else data.get("status"),
+                    "stage": "summary" if data.get("status") == "error_deadline" else None,
                     "input": {"url": url},
-                    "data": data
+                    "data": data,
+                    "timing": _timing(deadline)
                 }
             )
 
         if address:
-            prop_url = find_listing_url_with_fallback(address)
-            data = fetch_property_summary(prop_url)
+            # adres çözümü bütçenin tamamını yiyip özet adımını aç bırakmasın
+            addr_deadline = deadline.sub(min(SUMMARY_RESERVE_S, deadline.budget * 0.4)) if deadline else None
+            found = resolve_address(address, deadline=addr_deadline)
+            prop_url = found["url"]
+            if not prop_url:
+                deadline_hit = found["status"] == "deadline_exceeded"
+                return JSONResponse(
+                    status_code=200 if deadline_hit else 404,
+                    content={
+                        "ok": deadline_hit,
+                        "mode": "address",
+                        "status": found["status"],
+                        "stage": found["stage"],
+                        "input": {"address": address, "url": None, "locationIdentifier": found["locationIdentifier"]},
+                        "data": None,
+                        "timing": _timing(deadline)
+                    }
+                )
+
+            data = fetch_property_summary(prop_url, deadline=deadline)
             return JSONResponse(
                 status_code=200,
                 content={
                     "ok": True,
                     "mode": "address",
-                    "input": {"address": address, "url": prop_url},
-                    "data": data
+                    "status": "deadline_exceeded" if data.get("status") == "error_deadline" else data.get("status"),
+                    "stage": "summary" if data.get("status") == "error_deadline" else None,
+                    "input": {"address": address, "url": prop_url, "locationIdentifier": found["locationIdentifier"]},
+                    "data": data,
+                    "timing": _timing(deadline)
                 }
             )
 
@@ -203,5 +296,98 @@ def address_endpoint(
         return JSONResponse(status_code=500, content={"ok": False, "error": str(e)})
 
 
+# -------------------------------
+# 6) /listing-urls (bulk)
+# -------------------------------
+@app.post("/listing-urls")
+def listing_urls(
+    addresses: List[str] = Body(..., embed=True, description="Address rows from the sheet"),
+    max_pages: int = Body(1, embed=True, ge=1, le=5, description="Search-result pages per location group")
+):
+    """
+    Bulk version of /listing-url:
+    - Resolves every row to a locationIdentifier (once per distinct address)
+    - Fetches each search-result page once per location group
+    - Matches rows to listing cards by address similarity
+    Results are returned in input order.
+    """
+    try:
+        out = find_listing_urls_bulk(addresses, max_pages=max_pages)
+        return JSONResponse(
+            status_code=200,
+            content={
+                "ok": True,
+                "input": {"count": len(addresses), "max_pages": max_pages},
+                "data": out["results"],
+                "stats": out["stats"]
+            }
+        )
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"ok": False, "error": str(e)})
+
 
+# -------------------------------
+# 7) /nearby (local index only)
+# -------------------------------
+@app.get("/nearby")
+def nearby(
+    lat: Optional[float] = Query(None, ge=-90, le=90, description="Center latitude"),
+    lon: Optional[float] = Query(None, ge=-180, le=180, description="Center longitude"),
+    radius_m: float = Query(1000, gt=0, le=50000, description="Search radius in meters"),
+    south: Optional[float] = Query(None, description="Bounding box south latitude"),
+    west: Optional[float] = Query(None, description="Bounding box west longitude"),
+    north: Optional[float] = Query(None, description="Bounding box north latitude"),
+    east: Optional[float] = Query(None, description="Bounding box east longitude"),
+    min_price: Optional[int] = Query(None, ge=0),
+    max_price: Optional[int] = Query(None, ge=0),
+    min_beds: Optional[int] = Query(None, ge=0),
+    max_beds: Optional[int] = Query(None, ge=0),
+    types: Optional[str] = Query(None, description="Comma separated property types, e.g. 'flat,terraced'"),
+    limit: int = Query(50, ge=1, le=500)
+):
+    """
+    Returns previously scraped listings near a point (lat/lon + radius_m) or inside a
+    bounding box (south/west/north/east). Answered from the local index — no new crawl.
+    """
+    try:
+        # fetch_property_summary'nin doldurduğu varsayılan indeks
+        index = get_listing_index()
+        if index is None:
+            return JSONResponse(status_code=503, content={"ok": False, "error": "Listing index is disabled."})
+        type_list = [t for t in (types or "").split(",") if t.strip()] or None
+        filters = {
+            "min_price": min_price,
+            "max_price": max_price,
+            "min_beds": min_beds,
+            "max_beds": max_beds,
+            "types": type_list,
+            "limit": limit,
+        }
+        bbox = (south, west, north, east)
+        if all(v is not None for v in bbox):
+            if south > north or west > east:
+                return JSONResponse(status_code=400, content={"ok": False, "error": "Invalid bounding box."})
+            mode = "bbox"
+            results = index.within_bbox(south, west, north, east, **filters)
+        elif lat is not None and lon is not None:
+            mode = "radius"
+            results = index.nearby(lat, lon, radius_m, **filters)
+        else:
+            return JSONResponse(
+                status_code=400,
+                content={"ok": False, "error": "Provide either 'lat'+'lon' or 'south'+'west'+'north'+'east'."}
+            )
 
+        return JSONResponse(
+            status_code=200,
+            content={
+                "ok": True,
+                "mode": mode,
+                "input": {"lat": lat, "lon": lon, "radius_m": radius_m, "bbox": list(bbox), **filters},
+                "indexed": len(index),
+                "count": len(results),
+                "data": results
+            }
+        )
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"ok": False, "error": str(e)})
@@ -3,11 +3,36 @@ from .address_search import (
     autocomplete_address,
     find_listing_url_from_location_identifier,
     find_listing_url_with_fallback,
+    find_listing_urls_bulk,
+    resolve_address,
 )
+from .address_matcher import match_addresses, normalize_address
+from .listing_index import ListingIndex, get_listing_index, set_listing_index
+from .deadline import Deadline, DeadlineExceeded
+from .refresh_scheduler import RefreshScheduler
+from .egress import EgressPool, EgressRoute, get_egress_pool, set_egress_pool
+from .revalidation import ValidatorCache, get_validator_cache, set_validator_cache
 
 __all__ = [
     "fetch_property_summary",
     "autocomplete_address",
     "find_listing_url_from_location_identifier",
     "find_listing_url_with_fallback",
+    "find_listing_urls_bulk",
+    "resolve_address",
+    "match_addresses",
+    "normalize_address",
+    "ListingIndex",
+    "get_listing_index",
+    "set_listing_index",
+    "Deadline",
+    "DeadlineExceeded",
+    "RefreshScheduler",
+    "EgressPool",
+    "EgressRoute",
+    "get_egress_pool",
+    "set_egress_pool",
+    "ValidatorCache",
+    "get_validator_cache",
+    "set_validator_cache",
 ]
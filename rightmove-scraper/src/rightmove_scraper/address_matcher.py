@@ -0,0 +1,260 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import re
+
+# UK postcode: outcode + incode (ör. "SW1A 1AA", "N1 9GU"); boşluk opsiyonel
+POSTCODE_RE = re.compile(r"\b([A-Z]{1,2}\d[A-Z\d]?)\s*(\d[A-Z]{2})\b")
+OUTCODE_RE = re.compile(r"^[A-Z]{1,2}\d[A-Z\d]?$")
+
+# Kısaltmalar tek biçime çevrilir ("rd" -> "road")
+ABBREVIATIONS = {
+    "rd": "road",
+    "ave": "avenue",
+    "av": "avenue",
+    "ln": "lane",
+    "dr": "drive",
+    "cl": "close",
+    "ct": "court",
+    "cres": "crescent",
+    "gdns": "gardens",
+    "gdn": "garden",
+    "pl": "place",
+    "sq": "square",
+    "ter": "terrace",
+    "terr": "terrace",
+    "tce": "terrace",
+    "pk": "park",
+    "gr": "grove",
+    "hse": "house",
+    "mt": "mount",
+    "rte": "route",
+    "nth": "north",
+    "sth": "south",
+}
+# Daire/ünite işaretleri: kendisi ve aynı virgül bölümünde hemen ardından gelen ünite numarası atılır
+FLAT_WORDS = {"flat", "apartment", "apt", "unit", "suite", "room", "floor", "maisonette"}
+# "Ground Floor Flat", "1st floor": floor'dan önceki kat kelimeleri de daire önekidir
+FLOOR_LEVELS = {"ground", "lower", "upper", "top", "basement", "first", "second", "third", "fourth", "fifth"}
+ORDINAL_RE = re.compile(r"^\d+(st|nd|rd|th)$")
+STOPWORDS = {"the", "of", "and", "uk", "united", "kingdom", "england", "gb"}
+STREET_WORDS = {
+    "road", "street", "avenue", "lane", "drive", "close", "court", "crescent", "gardens", "garden",
+    "place", "square", "terrace", "park", "grove", "way", "walk", "hill", "row", "mews", "rise",
+    "vale", "view", "green", "parade", "mount", "yard", "wharf", "passage",
+}
+
+# Skor ağırlıkları
+W_TOKENS = 3.0          # token örtüşmesi (0..1) çarpanı
+W_POSTCODE = 4.0        # tam postcode eşleşmesi
+W_OUTCODE = 1.5         # outcode eşleşmesi
+P_OUTCODE = 2.0         # iki taraf da outcode taşıyor ama farklıysa ceza
+W_PREFIX = 0.5          # aday adı sorgu ile başlıyorsa
+W_NUMBER = 0.5          # ortak kapı/bina numarası; iki tarafta da numara var ama ortak yoksa ceza
+TYPE_BONUS = {
+    # sorgu türü -> aday türü -> bonus
+    "POSTCODE": {"POSTCODE": 1.5, "OUTCODE": 0.8, "STREET": 0.3},
+    "OUTCODE": {"OUTCODE": 1.5, "REGION": 0.5, "POSTCODE": 0.2},
+    "STREET": {"STREET": 1.0, "POSTCODE": 0.5, "OUTCODE": 0.3, "REGION": 0.2},
+    "TEXT": {"REGION": 0.6, "STREET": 0.5, "OUTCODE": 0.3, "POSTCODE": 0.3},
+}
+
+
+@lru_cache(maxsize=65536)
+def _normalize_cached(text: str) -> Tuple[Optional[str], Optional[str], Tuple[str, ...], Tuple[str, ...], str]:
+    upper = text.upper()
+
+    postcode = None
+    outcode = None
+    m = POSTCODE_RE.search(upper)
+    if m:
+        outcode = m.group(1)
+        postcode = f"{m.group(1)} {m.group(2)}"
+        upper = upper[: m.start()] + " " + upper[m.end():]
+
+    # virgüller ayrı token olarak kalır: ünite numarası virgülü aşmaz ("Flat, 12 High St")
+    raw = re.findall(r"[a-z0-9]+|,", upper.lower())
+    floor_prefix = set()
+    for i, tok in enumerate(raw):
+        if tok == "floor":
+            j = i - 1
+            while j >= 0 and (raw[j] in FLOOR_LEVELS or ORDINAL_RE.match(raw[j])):
+                floor_prefix.add(j)
+                j -= 1
+
+    tokens: List[str] = []
+    numbers: List[str] = []
+    after_flat = False
+    for i, tok in enumerate(raw):
+        if tok == "," or i in floor_prefix:
+            after_flat = False
+            continue
+        if after_flat:
+            after_flat = False
+            # sadece ünite işareti atılır: "3", "2b", "a"
+            if any(ch.isdigit() for ch in tok) or len(tok) == 1:
+                continue
+        if tok in FLAT_WORDS:
+            after_flat = True
+            continue
+        if any(ch.isdigit() for ch in tok):
+            # "N1" gibi tek başına outcode (postcode yoksa)
+            if outcode is None and OUTCODE_RE.match(tok.upper()):
+                outcode = tok.upper()
+                continue
+            numbers.append(tok)
+            continue
+        if tok in STOPWORDS:
+            continue
+        if tok == "st":
+            # "High St" -> street, "12 St Johns" -> saint
+            prev_word = i > 0 and raw[i - 1].isalpha() and raw[i - 1] not in FLAT_WORDS
+            tok = "street" if prev_word else "saint"
+        tokens.append(ABBREVIATIONS.get(tok, tok))
+
+    if postcode and not tokens:
+        kind = "POSTCODE"
+    elif outcode and not tokens:
+        kind = "OUTCODE"
+    elif STREET_WORDS.intersection(tokens):
+        kind = "STREET"
+    else:
+        kind = "TEXT"
+    return postcode, outcode, tuple(dict.fromkeys(tokens)), tuple(numbers), kind
+
+
+def normalize_address(text: str) -> Dict[str, Any]:
+    """
+    Adresi bir kez normalize eder:
+    { "postcode": "N1 1AA"|None, "outcode": "N1"|None, "tokens": (...), "numbers": (...), "kind": TYPE }
+    kind: POSTCODE (sadece postcode), OUTCODE (sadece outcode), STREET (cadde kelimesi var), TEXT
+    """
+    postcode, outcode, tokens, numbers, kind = _normalize_cached((text or "").strip())
+    return {"postcode": postcode, "outcode": outcode, "tokens": tokens, "numbers": numbers, "kind": kind}
+
+
+def _score(q: Dict[str, Any], c: Dict[str, Any], c_type: str) -> float:
+    score = 0.0
+
+    q_tokens = q["tokens"]
+    c_tokens = c["tokens"]
+    if q_tokens and c_tokens:
+        common = len(set(q_tokens).intersection(c_tokens))
+        # adayın ne kadarı sorguda var + sorgunun ne kadarı adayda var
+        score += W_TOKENS * 0.5 * (common / len(c_tokens) + common / len(q_tokens))
+        if common and q_tokens[: len(c_tokens)] == c_tokens[: len(q_tokens)]:
+            score += W_PREFIX
+
+    if q["postcode"] and c["postcode"] == q["postcode"]:
+        score += W_POSTCODE
+    if q["outcode"] and c["outcode"]:
+        if c["outcode"] == q["outcode"]:
+            score += W_OUTCODE
+        else:
+            score -= P_OUTCODE
+
+    if q["numbers"] and c["numbers"]:
+        score += W_NUMBER if set(q["numbers"]).intersection(c["numbers"]) else -W_NUMBER
+
+    score += TYPE_BONUS.get(q["kind"], {}).get(c_type, 0.0)
+    return score
+
+
+def _candidate_fields(it: dict) -> Tuple[str, str, str]:
+    name = it.get("displayName") or it.get("name") or ""
+    typ = it.get("type") or ""
+    idv = it.get("id") or it.get("locationIdentifier") or ""
+    return name, typ, str(idv)
+
+
+def match_addresses(queries: Sequence[str], candidates: Sequence[dict]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Çok sayıda sorguyu tek aday havuzuna karşı toplu skorlar.
+    Adaylar bir kez normalize edilir; token/postcode/outcode ters indeksi sayesinde
+    her sorgu sadece ortak sinyali olan adaylarla karşılaştırılır.
+    Her sorgu için { name, type, id, locationIdentifier, score } veya None döner.
+    """
+    norm_c: List[Dict[str, Any]] = []
+    fields: List[Tuple[str, str, str]] = []
+    index: Dict[str, List[int]] = {}
+    for it in candidates:
+        name, typ, idv = _candidate_fields(it)
+        if not typ or not idv:
+            continue
+        c = normalize_address(name)
+        norm_c.append(c)
+        fields.append((name, typ, idv))
+        pos = len(norm_c) - 1
+        keys = ["t:" + t for t in c["tokens"]]
+        if c["postcode"]:
+            keys.append("p:" + c["postcode"])
+        if c["outcode"]:
+            keys.append("o:" + c["outcode"])
+        for k in keys:
+            index.setdefault(k, []).append(pos)
+
+    out: List[Optional[Dict[str, Any]]] = []
+    for q_text in queries:
+        q = normalize_address(q_text)
+        keys = ["t:" + t for t in q["tokens"]]
+        if q["postcode"]:
+            keys.append("p:" + q["postcode"])
+        if q["outcode"]:
+            keys.append("o:" + q["outcode"])
+        pool = {pos for k in keys for pos in index.get(k, ())}
+
+        best = None
+        best_score = float("-inf")
+        for pos in sorted(pool):
+            sc = _score(q, norm_c[pos], fields[pos][1])
+            if sc > best_score:
+                best_score = sc
+                best = pos
+
+        if best is None:
+            out.append(None)
+            continue
+        name, typ, idv = fields[best]
+        out.append(
+            {"name": name, "type": typ, "id": idv, "locationIdentifier": f"{typ}^{idv}", "score": round(best_score, 3)}
+        )
+    return out
+
+
+def best_matches(queries: Sequence[str], candidates: Sequence[dict]) -> List[Optional[Dict[str, Any]]]:
+    """match_addresses gibi; ortak sinyali olmayan sorgular için ilk geçerli aday döner."""
+    first = None
+    for it in candidates:
+        name, typ, idv = _candidate_fields(it)
+        if typ and idv:
+            first = {"name": name, "type": typ, "id": idv, "locationIdentifier": f"{typ}^{idv}", "score": 0.0}
+            break
+    return [res if res is not None else (dict(first) if first else None) for res in match_addresses(queries, candidates)]
+
+
+def best_match(query: str, candidates: Sequence[dict]) -> Optional[Dict[str, Any]]:
+    """Tek sorgu için best_matches kısayolu."""
+    return best_matches([query], candidates)[0]
+
+
+
+def address_similarity(a: str, b: str) -> float:
+    """İki serbest adres metni arasında 0..1 benzerlik (token, postcode/outcode ve kapı numarası)."""
+    na = normalize_address(a)
+    nb = normalize_address(b)
+    score = 0.0
+    weight = 0.0
+    if na["tokens"] and nb["tokens"]:
+        common = len(set(na["tokens"]).intersection(nb["tokens"]))
+        score += 0.6 * 0.5 * (common / len(na["tokens"]) + common / len(nb["tokens"]))
+        weight += 0.6
+    if na["outcode"] and nb["outcode"]:
+        if na["postcode"] and nb["postcode"]:
+            same = 1.0 if na["postcode"] == nb["postcode"] else (0.4 if na["outcode"] == nb["outcode"] else 0.0)
+        else:
+            same = 1.0 if na["outcode"] == nb["outcode"] else 0.0
+        score += 0.25 * same
+        weight += 0.25
+    if na["numbers"] and nb["numbers"]:
+        score += 0.15 if set(na["numbers"]).intersection(nb["numbers"]) else 0.0
+        weight += 0.15
+    return score / weight if weight else 0.0
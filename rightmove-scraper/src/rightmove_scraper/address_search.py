@@ -1,11 +1,18 @@
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import time
 import json
 import re
+from urllib.parse import urlencode
 
 import requests
 from bs4 import BeautifulSoup
 
+from .address_matcher import address_similarity, best_match, best_matches, normalize_address
+from .deadline import Deadline, DeadlineExceeded, step_timeout
+from .egress import http_get
+from .revalidation import get_validator_cache
+from .url_scraper import _read_body
+
 HEADERS = {
     "User-Agent": (
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -30,39 +37,64 @@ def _json_get(resp: requests.Response) -> Optional[dict]:
         return None
 
 
-def autocomplete_address(query: str, timeout: int = 10) -> Optional[Dict[str, str]]:
+def autocomplete_address(
+    query: str, timeout: int = 10, deadline: Optional[Deadline] = None
+) -> Optional[Dict[str, str]]:
     """
     Smart scoring ile en iyi eşleşen yeri döndürür:
     { "name": displayName, "type": TYPE, "id": ID, "locationIdentifier": "TYPE^ID" }
+    deadline verilirse timeout kalan süreye göre kırpılır; süre yetmezse DeadlineExceeded.
     """
     q = (query or "").strip()
     if len(q) < 2:
         return None
 
+    for results in _typeahead_results(q, timeout=timeout, deadline=deadline):
+        choice = _pick_best_match(q, results)
+        if choice:
+            return choice
+    return None
+
+
+def _typeahead_results(q: str, timeout: int = 10, deadline: Optional[Deadline] = None) -> Iterator[List[dict]]:
+    """
+    Typeahead aday listelerini sırayla üretir: önce birincil (LOS), istenirse alternatif (www).
+    Alternatif endpoint sadece çağıran bir sonraki listeyi isterse çağrılır; hata olursa liste boş.
+    """
     # 1) Birincil (LOS)
+    los_timeout = step_timeout(deadline, timeout, "autocomplete")
+    results: List[dict] = []
     try:
-        r = requests.get(
+        r = http_get(
             LOS_ENDPOINT,
             params={"query": q, "limit": 10, "channel": "BUY"},
             headers=HEADERS,
-            timeout=timeout,
+            timeout=los_timeout,
+            stream=deadline is not None,
         )
+        if deadline is not None:
+            _read_body(r, deadline, stage="autocomplete")
         if r.status_code == 200:
             data = _json_get(r) or {}
             results = data.get("matches") or data.get("typeahead") or []
-            choice = _pick_best_match(q, results)
-            if choice:
-                return choice
+    except DeadlineExceeded:
+        raise
     except Exception:
         pass
+    yield results
 
     # 2) Alternatif (www) — bazen farklı veri döner
+    alt_timeout = step_timeout(deadline, timeout, "autocomplete_fallback")
+    results = []
     try:
-        r2 = requests.get(ALT_ENDPOINT.format(q.replace(" ", "%20")), headers=HEADERS, timeout=timeout)
+        r2 = http_get(
+            ALT_ENDPOINT.format(q.replace(" ", "%20")), headers=HEADERS, timeout=alt_timeout, stream=deadline is not None
+        )
+        if deadline is not None:
+            _read_body(r2, deadline, stage="autocomplete_fallback")
         if r2.status_code == 200:
             res = _json_get(r2) or []
             # www endpoint doğrudan list döndürür
-            results = []
             for it in res:
                 results.append(
                     {
@@ -71,131 +103,299 @@ def autocomplete_address(query: str, timeout: int = 10) -> Optional[Dict[str, st
                         "displayName": it.get("displayName"),
                     }
                 )
-            choice = _pick_best_match(q, results)
-            if choice:
-                return choice
+    except DeadlineExceeded:
+        raise
     except Exception:
         pass
-
-    return None
-
-
-def _score_match(q: str, name: str, typ: str) -> float:
-    """A1 – smart scoring: prefix + içerme + type önceliği (STREET > POSTCODE > REGION)."""
-    q_l = q.lower()
-    n_l = (name or "").lower()
-    score = 0.0
-
-    if n_l.startswith(q_l):
-        score += 2.0
-    if q_l in n_l:
-        score += 1.0
-
-    # type boost
-    if typ == "STREET":
-        score += 1.5
-    elif typ in ("POSTCODE", "OUTCODE"):
-        score += 1.2
-    elif typ == "REGION":
-        score += 1.0
-
-    # London/UK sinyalleri (yanlış ülke riskini azaltır)
-    if "london" in n_l:
-        score += 0.3
-
-    return score
+    yield results
 
 
 def _pick_best_match(q: str, results: List[dict]) -> Optional[Dict[str, str]]:
+    """Normalize edilmiş adres + postcode/outcode + type tercihine göre en iyi adayı seçer."""
     if not results:
         return None
+    best = best_match(q, results)
+    if best is None:
+        return None
+    # dış sözleşme: { name, type, id, locationIdentifier }
+    return {k: best[k] for k in ("name", "type", "id", "locationIdentifier")}
 
-    best = None
-    best_score = -1.0
-    for it in results:
-        name = it.get("displayName") or it.get("name") or ""
-        typ = it.get("type") or ""
-        idv = it.get("id") or it.get("locationIdentifier") or ""
 
-        sc = _score_match(q, name, typ)
-        if sc > best_score:
-            best_score = sc
-            best = {"name": name, "type": typ, "id": str(idv), "locationIdentifier": f"{typ}^{idv}"}
+FIND_ENDPOINT = "https://www.rightmove.co.uk/property-for-sale/find.html"
+SEARCH_ENDPOINT = "https://www.rightmove.co.uk/property-for-sale/search.html"
+# Bu skorun altındaki kartlar eşleşme sayılmaz (URL dönülmez); toplu modda sonraki sayfaya bakılır
+MIN_CARD_SCORE = 0.5
+PAGE_SIZE = 24
 
-    # Eksik parça varsa None dön
-    if not best or not best.get("type") or not best.get("id"):
-        return None
-    return best
 
+def _card_address(a) -> str:
+    """Kart linkinin bağlı olduğu ilan kartındaki adres metnini bulur."""
+    node = a
+    for _ in range(8):
+        if node is None:
+            break
+        el = node.find("address")
+        if el:
+            return el.get_text(" ", strip=True)
+        node = node.parent
+    return a.get("title") or a.get_text(" ", strip=True)
 
-def find_listing_url_from_location_identifier(location_identifier: str, timeout: int = 12) -> Optional[str]:
-    """
-    TYPE^ID ile arama sayfasına gider, ilk ilan linkini döndürür.
-    """
-    base = "https://www.rightmove.co.uk/property-for-sale/find.html"
+
+def _parse_search_cards(html: str) -> List[Dict[str, str]]:
+    """Arama sonuç sayfasındaki ilanları [{url, address}] olarak döndürür (sayfa sırasıyla)."""
+    soup = BeautifulSoup(html, "lxml")
+    cards: List[Dict[str, str]] = []
+    seen = set()
+    for a in soup.select("a.propertyCard-link"):
+        href = a.get("href") or ""
+        if not href or href.rstrip("/") == "/properties":
+            continue
+        url = "https://www.rightmove.co.uk" + href if href.startswith("/properties") else href
+        if url in seen:
+            continue
+        seen.add(url)
+        cards.append({"url": url, "address": _card_address(a)})
+    return cards
+
+
+def _fetch_search_cards(
+    location_identifier: str, timeout: int = 12, index: int = 0, deadline: Optional[Deadline] = None
+) -> Optional[List[Dict[str, str]]]:
+    """find.html sonuç sayfasını bir kez indirip kartları döndürür; hata durumunda None."""
     params = {
         "locationIdentifier": location_identifier,
         "sortType": "6",  # Most recent
         "propertyTypes": "detached,semi-detached,terraced,flat",
         "viewType": "LIST",
         "channel": "BUY",
-        "index": "0",
+        "index": str(index),
     }
 
+    req_timeout = step_timeout(deadline, timeout, "search")
+    return _get_search_cards(FIND_ENDPOINT + "?" + urlencode(params), timeout=req_timeout, deadline=deadline, stage="search")
+
+
+def _get_search_cards(
+    url: str, timeout: float, deadline: Optional[Deadline] = None, stage: str = "search"
+) -> Optional[List[Dict[str, str]]]:
+    """
+    Sonuç sayfasını koşullu ister: daha önce ETag/Last-Modified ile saklandıysa
+    304 cevabında saklı kartlar döner, sayfa tekrar parse edilmez.
+    deadline verilirse gövde stream edilip parça parça, kalan süreyle sınırlı okunur.
+    """
+    cache = get_validator_cache()
+    entry = cache.get(url) if cache is not None else None
+    headers = dict(HEADERS, **(cache.conditional_headers(entry) if cache is not None else {}))
     try:
-        r = requests.get(base, params=params, headers=HEADERS, timeout=timeout)
+        r = http_get(url, headers=headers, timeout=timeout, stream=deadline is not None)
+        if deadline is not None:
+            _read_body(r, deadline, stage=stage)
+        if r.status_code == 304 and entry:
+            cache.record("search", "hit")
+            return cache.payload(entry)
+        if cache is not None:
+            cache.record("search", "miss" if entry else "uncached")
         if r.status_code != 200:
             return None
+    except DeadlineExceeded:
+        raise
     except Exception:
         return None
 
-    soup = BeautifulSoup(r.text, "lxml")
-    a = soup.select_one("a.propertyCard-link")
-    if not a:
-        return None
-    href = a.get("href") or ""
-    if href.startswith("/properties"):
-        return "https://www.rightmove.co.uk" + href
-    return href or None
+    cards = _parse_search_cards(r.text)
+    if cache is not None:
+        cache.store(url, r.headers, cards)
+    return cards
 
 
-def find_listing_url_with_fallback(address_text: str, timeout: int = 12) -> Optional[str]:
+def _pick_card(address_text: Optional[str], cards: List[Dict[str, str]]) -> Tuple[Optional[str], float]:
     """
-    En güvenilir zincir:
-    1) autocomplete → TYPE^ID
-    2) find.html ile ilk ilan linkini al
-    3) Gerekirse eski yaklaşım: search.html + 'a.propertyCard-link'
+    Adrese en benzer kartı seçer: (url, skor).
+    Sorguda cadde ya da kapı numarası varsa en iyi skor MIN_CARD_SCORE altında kaldığında url None.
+    Sadece postcode/bölge sorgularında (kartla sokak düzeyinde örtüşme olamaz) eşik uygulanmaz;
+    hiçbir kart benzemiyorsa ilk kart döner. Adres verilmezse de ilk kart döner.
     """
-    q = (address_text or "").strip()
-    if len(q) < 2:
-        return None
+    if not cards:
+        return None, 0.0
+    if not address_text:
+        return cards[0]["url"], 0.0
 
-    # 1) Autocomplete
-    best = autocomplete_address(q, timeout=timeout)
-    if best and best.get("locationIdentifier"):
-        url = find_listing_url_from_location_identifier(best["locationIdentifier"], timeout=timeout)
-        if url:
-            return url
+    best_url = cards[0]["url"]
+    best_score = 0.0
+    for card in cards:
+        sc = address_similarity(address_text, card.get("address") or "")
+        if sc > best_score:
+            best_score = sc
+            best_url = card["url"]
 
-    # 2) Fallback — eski yöntem
-    from urllib.parse import urlencode
-    base = "https://www.rightmove.co.uk/property-for-sale/search.html"
+    n = normalize_address(address_text)
+    if n["kind"] == "STREET" or n["numbers"]:
+        return (best_url if best_score >= MIN_CARD_SCORE else None), best_score
+    return best_url, best_score
+
+
+def find_listing_url_from_location_identifier(
+    location_identifier: str,
+    timeout: int = 12,
+    address_text: Optional[str] = None,
+    deadline: Optional[Deadline] = None,
+) -> Optional[str]:
+    """
+    TYPE^ID ile arama sayfasına gider; address_text verilirse adrese en benzer ilanı,
+    verilmezse ilk ilan linkini döndürür.
+    """
+    cards = _fetch_search_cards(location_identifier, timeout=timeout, deadline=deadline)
+    url, _ = _pick_card(address_text, cards or [])
+    return url
+
+
+def _search_html_cards(q: str, timeout: int = 12, deadline: Optional[Deadline] = None) -> Optional[List[Dict[str, str]]]:
+    """Eski yöntem: search.html?searchLocation=... sonuç kartları."""
     params = {
         "searchLocation": q,
         "buy": "For sale",
         "useLocationIdentifier": "true",
     }
+    req_timeout = step_timeout(deadline, timeout, "search_fallback")
+    return _get_search_cards(
+        SEARCH_ENDPOINT + "?" + urlencode(params), timeout=req_timeout, deadline=deadline, stage="search_fallback"
+    )
+
+
+def resolve_address(address_text: str, timeout: int = 12, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+    """
+    En güvenilir zincir:
+    1) autocomplete → TYPE^ID
+    2) find.html kartlarından adrese en benzer ilan linkini al
+    3) Gerekirse eski yaklaşım: search.html + 'a.propertyCard-link'
+
+    Dönen: { status: success|unmatched|not_found|deadline_exceeded, stage, locationIdentifier, url }
+    unmatched: sorguda cadde/numara var, sonuç kartları var ama hiçbiri yeterince benzemiyor (url None).
+    deadline verilirse her adım kalan süreye göre boyutlanır; sığmayan adım atlanır ve
+    o ana kadar bulunanlarla "deadline_exceeded" dönülür (stage: kesilen adım).
+    """
+    out: Dict[str, Any] = {"status": "not_found", "stage": None, "locationIdentifier": None, "url": None}
+    q = (address_text or "").strip()
+    if len(q) < 2:
+        return out
+
+    saw_cards = False
     try:
-        r2 = requests.get(base + "?" + urlencode(params), headers=HEADERS, timeout=timeout)
-        if r2.status_code != 200:
-            return None
-        soup = BeautifulSoup(r2.text, "lxml")
-        a = soup.select_one("a.propertyCard-link")
-        if not a:
-            return None
-        href = a.get("href") or ""
-        if href.startswith("/properties"):
-            return "https://www.rightmove.co.uk" + href
-        return href or None
-    except Exception:
-        return None
+        # 1) Autocomplete
+        best = autocomplete_address(q, timeout=timeout, deadline=deadline)
+        if best and best.get("locationIdentifier"):
+            out["locationIdentifier"] = best["locationIdentifier"]
+            cards = _fetch_search_cards(best["locationIdentifier"], timeout=timeout, deadline=deadline)
+            saw_cards = bool(cards)
+            url, _ = _pick_card(q, cards or [])
+            if url:
+                out.update(status="success", url=url)
+                return out
+
+        # 2) Fallback — eski yöntem
+        cards = _search_html_cards(q, timeout=timeout, deadline=deadline)
+        saw_cards = saw_cards or bool(cards)
+        url, _ = _pick_card(q, cards or [])
+        if url:
+            out.update(status="success", url=url)
+        elif saw_cards:
+            out["status"] = "unmatched"
+    except DeadlineExceeded as e:
+        out.update(status="deadline_exceeded", stage=e.stage)
+    return out
+
+
+def find_listing_url_with_fallback(
+    address_text: str, timeout: int = 12, deadline: Optional[Deadline] = None
+) -> Optional[str]:
+    """resolve_address zincirinin sadece URL'ini döndürür (bulunamazsa veya süre biterse None)."""
+    return resolve_address(address_text, timeout=timeout, deadline=deadline)["url"]
+
+
+def _query_key(q: str) -> Tuple[Any, ...]:
+    """Aynı lokasyona çözülecek satırlar için anahtar (daire/kapı numarası hariç)."""
+    n = normalize_address(q)
+    return (n["postcode"], n["outcode"], n["tokens"]) if (n["tokens"] or n["outcode"]) else (q.lower(),)
+
+
+def find_listing_urls_bulk(addresses: List[str], timeout: int = 12, max_pages: int = 1) -> Dict[str, Any]:
+    """
+    Toplu çözümleme:
+    1) Her farklı adres anahtarı için bir kez typeahead; anahtarın satırları adaylara toplu skorlanır → TYPE^ID
+    2) Satırları locationIdentifier'a göre grupla
+    3) Her grup için find.html sonuç sayfasını bir kez indir (eşleşmeyen satır kalırsa max_pages'e kadar devam)
+    4) Satırları kartlarla adres benzerliğine göre yerelde eşleştir (cadde/numara içeren satırlarda
+       MIN_CARD_SCORE altı eşleşme sayılmaz)
+    5) Lokasyonu ya da sonuç kartı bulunamayan satırlar için search.html fallback (anahtar başına bir kez)
+
+    Dönen: { "results": [{address, locationIdentifier, url, score, status}], "stats": {...} }
+    status: matched | unmatched (kartlar var ama benzer değil, url None) | not_found
+    """
+    rows = [(a or "").strip() for a in addresses]
+    results: List[Dict[str, Any]] = [
+        {"address": a, "locationIdentifier": None, "url": None, "score": 0.0, "status": "not_found"} for a in rows
+    ]
+    stats = {"rows": len(rows), "autocomplete_calls": 0, "groups": 0, "search_fetches": 0, "fallback_fetches": 0}
+
+    # 1) autocomplete: anahtar başına bir typeahead, anahtarın tüm satırları aday listesine toplu skorlanır
+    rows_by_key: Dict[Tuple[Any, ...], List[int]] = {}
+    for i, q in enumerate(rows):
+        if len(q) >= 2:
+            rows_by_key.setdefault(_query_key(q), []).append(i)
+    for idxs in rows_by_key.values():
+        stats["autocomplete_calls"] += 1
+        for candidates in _typeahead_results(rows[idxs[0]], timeout=timeout):
+            picks = best_matches([rows[i] for i in idxs], candidates)
+            if any(picks):
+                for i, best in zip(idxs, picks):
+                    results[i]["locationIdentifier"] = best["locationIdentifier"] if best else None
+                break
+
+    # 2) gruplama
+    groups: Dict[str, List[int]] = {}
+    for i, res in enumerate(results):
+        if res["locationIdentifier"]:
+            groups.setdefault(res["locationIdentifier"], []).append(i)
+    stats["groups"] = len(groups)
+
+    # 3-4) grup başına sayfa indir, satırları yerelde eşleştir
+    for loc_id, idxs in groups.items():
+        pending = list(idxs)
+        for page in range(max(1, max_pages)):
+            cards = _fetch_search_cards(loc_id, timeout=timeout, index=page * PAGE_SIZE)
+            stats["search_fetches"] += 1
+            if not cards:
+                break
+            still: List[int] = []
+            for i in pending:
+                url, sc = _pick_card(rows[i], cards)
+                if sc > results[i]["score"]:
+                    results[i]["score"] = round(sc, 3)
+                    results[i]["url"] = url
+                results[i]["status"] = "matched" if results[i]["url"] else "unmatched"
+                if results[i]["url"] is None:
+                    still.append(i)
+            pending = still
+            if not pending or len(cards) < PAGE_SIZE:
+                break
+
+    # 5) fallback
+    fallback_by_key: Dict[Tuple[Any, ...], Optional[List[Dict[str, str]]]] = {}
+    for i, q in enumerate(rows):
+        # kartları zaten incelenmiş (unmatched) satırlar için ek istek yapılmaz
+        if results[i]["status"] != "not_found" or len(q) < 2:
+            continue
+        key = _query_key(q)
+        if key not in fallback_by_key:
+            stats["fallback_fetches"] += 1
+            fallback_by_key[key] = _search_html_cards(q, timeout=timeout)
+        cards = fallback_by_key[key] or []
+        url, sc = _pick_card(q, cards)
+        results[i]["url"] = url
+        results[i]["score"] = round(sc, 3)
+        if url:
+            results[i]["status"] = "matched"
+        elif cards:
+            results[i]["status"] = "unmatched"
+
+    return {"results": results, "stats": stats}
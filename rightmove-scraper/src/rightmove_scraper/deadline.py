@@ -0,0 +1,60 @@
+from typing import Optional
+import time
+
+# Bundan az süre kalan bir adıma (istek/retry/fallback) hiç başlanmaz
+MIN_STEP_SECONDS = 1.0
+
+
+class DeadlineExceeded(Exception):
+    """Süre bütçesi bir adım başlamadan/bitmeden tükendi; stage hangi adımda olduğunu söyler."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"deadline exceeded during {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    """İstek başına mutlak bitiş zamanı (monotonic). Zincirdeki her adıma aynı nesne geçirilir."""
+
+    def __init__(self, seconds: float):
+        self.budget = float(seconds)
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + self.budget
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def sub(self, reserve: float) -> "Deadline":
+        """reserve saniye erken biten alt bütçe (sonraki adımlara süre bırakmak için)."""
+        child = Deadline(0)
+        child.started_at = self.started_at
+        child.expires_at = self.expires_at - max(0.0, reserve)
+        child.budget = child.expires_at - child.started_at
+        return child
+
+
+def step_timeout(deadline: Optional[Deadline], timeout: float, stage: str) -> float:
+    """
+    Adımın timeout'unu kalan süreye göre kırpar.
+    Deadline yoksa timeout aynen döner; MIN_STEP_SECONDS'tan az kaldıysa DeadlineExceeded.
+    """
+    if deadline is None:
+        return timeout
+    left = deadline.remaining()
+    if left < MIN_STEP_SECONDS:
+        raise DeadlineExceeded(stage)
+    return min(timeout, left)
+
+
+def can_afford(deadline: Optional[Deadline], seconds: float) -> bool:
+    """seconds kadar bekledikten sonra hâlâ bir adım atacak süre kalır mı?"""
+    if deadline is None:
+        return True
+    return deadline.remaining() - seconds >= MIN_STEP_SECONDS
+
@@ -0,0 +1,215 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Ban sinyali sayılan cevaplar: rota hemen soğumaya alınır
+BAN_STATUSES = (403, 429)
+# Bu kadar ardışık hata (exception/5xx) sonrası rota soğumaya alınır
+MAX_CONSECUTIVE_FAILURES = 3
+
+
+class _SourceAddressAdapter(HTTPAdapter):
+    """Bağlantıları belirli bir yerel IP'den açan adapter."""
+
+    def __init__(self, source_address: str, **kwargs):
+        self._source_address = (source_address, 0)
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["source_address"] = self._source_address
+        return super().init_poolmanager(*args, **kwargs)
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        proxy_kwargs["source_address"] = self._source_address
+        return super().proxy_manager_for(proxy, **proxy_kwargs)
+
+
+class EgressRoute:
+    """
+    Tek çıkış kimliği: proxy, yerel kaynak IP ve/veya header profili (User-Agent vb.).
+    Kendi Session'ını tutar (keep-alive rota başına yeniden kullanılır).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        proxies: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        source_address: Optional[str] = None,
+        weight: float = 1.0,
+    ):
+        self.name = name
+        self.proxies = proxies or {}
+        self.headers = headers or {}
+        self.source_address = source_address
+        self.weight = weight
+        self._session: Optional[requests.Session] = None
+
+        # sağlık istatistikleri
+        self.latency_ewma: Optional[float] = None
+        self.success_ewma = 1.0
+        self.requests = 0
+        self.failures = 0
+        self.bans = 0
+        self.consecutive_failures = 0
+        self.consecutive_bans = 0
+        self.cooldown_until = 0.0
+
+    @classmethod
+    def from_proxy(cls, proxy_url: str, **kwargs) -> "EgressRoute":
+        return cls(name=proxy_url, proxies={"http": proxy_url, "https": proxy_url}, **kwargs)
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            s = requests.Session()
+            if self.proxies:
+                s.proxies.update(self.proxies)
+            if self.source_address:
+                adapter = _SourceAddressAdapter(self.source_address)
+                s.mount("http://", adapter)
+                s.mount("https://", adapter)
+            self._session = s
+        return self._session
+
+    def score(self) -> float:
+        """Son dönem verimi: başarı oranı / gecikme (≈ saniyede başarılı istek) × ağırlık."""
+        latency = self.latency_ewma if self.latency_ewma is not None else 1.0
+        return self.weight * max(self.success_ewma, 0.01) / max(latency, 0.05)
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "healthy": self.cooldown_until <= now,
+            "cooldown_s": round(max(0.0, self.cooldown_until - now), 1),
+            "requests": self.requests,
+            "failures": self.failures,
+            "bans": self.bans,
+            "success_rate": round(self.success_ewma, 3),
+            "latency_s": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            "score": round(self.score(), 3),
+        }
+
+
+class EgressPool:
+    """
+    Çıkış rotaları havuzu.
+    - Her istek sağlıklı rotalar arasından score() ağırlıklı rastgele seçilen rotadan çıkar.
+    - 403/429 ban sayılır: rota cooldown * 2^(ardışık ban-1) kadar (max_cooldown'a kadar) devre dışı.
+    - Ardışık MAX_CONSECUTIVE_FAILURES hata (exception/5xx) da cooldown'a sokar.
+    - Hiç sağlıklı rota yoksa cooldown'u en erken biten kullanılır.
+    """
+
+    def __init__(
+        self,
+        routes: Sequence[EgressRoute],
+        cooldown: float = 120.0,
+        max_cooldown: float = 1800.0,
+        alpha: float = 0.2,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Optional[random.Random] = None,
+    ):
+        if not routes:
+            raise ValueError("EgressPool needs at least one route")
+        self.routes = list(routes)
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.alpha = alpha
+        self.clock = clock
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_proxies(cls, proxy_urls: Sequence[str], **kwargs) -> "EgressPool":
+        return cls([EgressRoute.from_proxy(p) for p in proxy_urls], **kwargs)
+
+    def pick(self) -> EgressRoute:
+        now = self.clock()
+        with self._lock:
+            healthy = [r for r in self.routes if r.cooldown_until <= now]
+            if not healthy:
+                return min(self.routes, key=lambda r: r.cooldown_until)
+            weights = [r.score() for r in healthy]
+            return self._rng.choices(healthy, weights=weights, k=1)[0]
+
+    def report(
+        self,
+        route: EgressRoute,
+        status_code: Optional[int] = None,
+        latency: Optional[float] = None,
+        error: Optional[Exception] = None,
+    ) -> None:
+        now = self.clock()
+        a = self.alpha
+        with self._lock:
+            route.requests += 1
+            if latency is not None:
+                route.latency_ewma = latency if route.latency_ewma is None else (1 - a) * route.latency_ewma + a * latency
+
+            ok = error is None and status_code is not None and status_code < 500 and status_code not in BAN_STATUSES
+            route.success_ewma = (1 - a) * route.success_ewma + a * (1.0 if ok else 0.0)
+            if ok:
+                route.consecutive_failures = 0
+                route.consecutive_bans = 0
+                return
+
+            route.failures += 1
+            if status_code in BAN_STATUSES:
+                route.bans += 1
+                route.consecutive_bans += 1
+                wait = min(self.max_cooldown, self.cooldown * 2 ** (route.consecutive_bans - 1))
+                route.cooldown_until = now + wait
+                return
+
+            route.consecutive_failures += 1
+            if route.consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
+                route.consecutive_failures = 0
+                route.cooldown_until = now + self.cooldown
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, **kwargs) -> requests.Response:
+        """Seçilen rotadan GET; rota header'ları verilen header'ların üstüne yazılır."""
+        route = self.pick()
+        merged = dict(headers or {})
+        merged.update(route.headers)
+        t0 = time.monotonic()
+        try:
+            resp = route.session.get(url, headers=merged, **kwargs)
+        except Exception as e:
+            self.report(route, latency=time.monotonic() - t0, error=e)
+            raise
+        self.report(route, status_code=resp.status_code, latency=time.monotonic() - t0)
+        return resp
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = self.clock()
+        with self._lock:
+            return [r.snapshot(now) for r in self.routes]
+
+
+_POOL: Optional[EgressPool] = None
+
+
+def set_egress_pool(pool: Optional[EgressPool]) -> None:
+    """Tüm scraper trafiği için havuzu ayarlar; None varsayılan tek kimliğe döner."""
+    global _POOL
+    _POOL = pool
+
+
+def get_egress_pool() -> Optional[EgressPool]:
+    return _POOL
+
+
+def http_get(
+    url: str, headers: Optional[Dict[str, str]] = None, session: Optional[requests.Session] = None, **kwargs
+) -> requests.Response:
+    """Havuz ayarlıysa onun üzerinden, değilse verilen session (veya requests) ile GET."""
+    pool = _POOL
+    if pool is not None:
+        return pool.get(url, headers=headers, **kwargs)
+    if session is not None:
+        return session.get(url, headers=headers, **kwargs)
+    return requests.get(url, headers=headers, **kwargs)
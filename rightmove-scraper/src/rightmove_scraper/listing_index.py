@@ -0,0 +1,197 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import math
+import re
+import threading
+
+EARTH_RADIUS_M = 6371000.0
+# 1 derece enlem ~111.32 km
+METERS_PER_DEG_LAT = 111320.0
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """İki koordinat arasındaki büyük daire mesafesi (metre)."""
+    p1 = math.radians(lat1)
+    p2 = math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lon2 - lon1)
+    h = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(h)))
+
+
+class ListingIndex:
+    """
+    fetch_property_summary sonuçları için bellek içi mekânsal indeks.
+    Koordinatlar sabit boyutlu enlem/boylam hücrelerine (grid) dağıtılır; yarıçap ve
+    bbox sorguları sadece kesişen hücreleri tarar. URL başına tek kayıt tutulur (son gelen kazanır).
+    """
+
+    def __init__(self, cell_deg: float = 0.01):
+        self.cell_deg = cell_deg
+        self._lock = threading.Lock()
+        self._items: Dict[str, Dict[str, Any]] = {}
+        self._cells: Dict[Tuple[int, int], Dict[str, Tuple[float, float]]] = {}
+        self._cell_of: Dict[str, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def add(self, summary: Dict[str, Any]) -> bool:
+        """Başarılı ve koordinatı olan özeti indeksler; eklenmezse False döner."""
+        if not isinstance(summary, dict) or summary.get("status") != "success":
+            return False
+        url = summary.get("url")
+        loc = summary.get("location") or {}
+        lat = loc.get("lat")
+        lon = loc.get("lon")
+        if not url or lat is None or lon is None:
+            return False
+
+        cell = self._cell(lat, lon)
+        with self._lock:
+            old = self._cell_of.get(url)
+            if old is not None and old != cell:
+                self._cells[old].pop(url, None)
+                if not self._cells[old]:
+                    del self._cells[old]
+            self._cells.setdefault(cell, {})[url] = (lat, lon)
+            self._cell_of[url] = cell
+            self._items[url] = summary
+        return True
+
+    def remove(self, url: str) -> None:
+        with self._lock:
+            cell = self._cell_of.pop(url, None)
+            self._items.pop(url, None)
+            if cell is not None:
+                self._cells[cell].pop(url, None)
+                if not self._cells[cell]:
+                    del self._cells[cell]
+
+    def _candidates(self, south: float, west: float, north: float, east: float) -> Iterable[Tuple[str, float, float]]:
+        c_s, c_w = self._cell(south, west)
+        c_n, c_e = self._cell(north, east)
+        n_cells = (c_n - c_s + 1) * (c_e - c_w + 1)
+        if n_cells > len(self._cells):
+            # geniş sorgu: hücre hücre gezmek yerine dolu hücreleri tara
+            cells = [c for c in self._cells if c_s <= c[0] <= c_n and c_w <= c[1] <= c_e]
+        else:
+            cells = [(i, j) for i in range(c_s, c_n + 1) for j in range(c_w, c_e + 1)]
+        for c in cells:
+            for url, (lat, lon) in self._cells.get(c, {}).items():
+                if south <= lat <= north and west <= lon <= east:
+                    yield url, lat, lon
+
+    def _query(
+        self,
+        bbox: Tuple[float, float, float, float],
+        center: Optional[Tuple[float, float]],
+        radius_m: Optional[float],
+        filters: Dict[str, Any],
+        limit: int,
+    ) -> List[Dict[str, Any]]:
+        out: List[Tuple[float, Dict[str, Any]]] = []
+        with self._lock:
+            for url, lat, lon in self._candidates(*bbox):
+                dist = haversine_m(center[0], center[1], lat, lon) if center else None
+                if radius_m is not None and dist is not None and dist > radius_m:
+                    continue
+                item = self._items[url]
+                if not _matches(item, **filters):
+                    continue
+                row = dict(item)
+                row["distance_m"] = round(dist, 1) if dist is not None else None
+                out.append((dist or 0.0, row))
+        out.sort(key=lambda x: x[0])
+        return [row for _, row in out[:limit]]
+
+    def nearby(
+        self,
+        lat: float,
+        lon: float,
+        radius_m: float,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        min_beds: Optional[int] = None,
+        max_beds: Optional[int] = None,
+        types: Optional[Sequence[str]] = None,
+        limit: int = 50,
+    ) -> List[Dict[str, Any]]:
+        """Merkeze radius_m içindeki ilanlar, mesafeye göre sıralı (distance_m eklenir)."""
+        d_lat = radius_m / METERS_PER_DEG_LAT
+        d_lon = radius_m / (METERS_PER_DEG_LAT * max(math.cos(math.radians(lat)), 1e-6))
+        bbox = (lat - d_lat, lon - d_lon, lat + d_lat, lon + d_lon)
+        filters = {"min_price": min_price, "max_price": max_price, "min_beds": min_beds, "max_beds": max_beds, "types": types}
+        return self._query(bbox, (lat, lon), radius_m, filters, limit)
+
+    def within_bbox(
+        self,
+        south: float,
+        west: float,
+        north: float,
+        east: float,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        min_beds: Optional[int] = None,
+        max_beds: Optional[int] = None,
+        types: Optional[Sequence[str]] = None,
+        limit: int = 50,
+    ) -> List[Dict[str, Any]]:
+        """Dikdörtgen içindeki ilanlar; sıralama bbox merkezine uzaklığa göre."""
+        center = ((south + north) / 2, (west + east) / 2)
+        filters = {"min_price": min_price, "max_price": max_price, "min_beds": min_beds, "max_beds": max_beds, "types": types}
+        return self._query((south, west, north, east), center, None, filters, limit)
+
+
+def _matches(
+    item: Dict[str, Any],
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    min_beds: Optional[int] = None,
+    max_beds: Optional[int] = None,
+    types: Optional[Sequence[str]] = None,
+) -> bool:
+    price = item.get("price")
+    if (min_price is not None or max_price is not None) and price is None:
+        return False
+    if min_price is not None and price < min_price:
+        return False
+    if max_price is not None and price > max_price:
+        return False
+
+    beds = item.get("bedrooms")
+    if (min_beds is not None or max_beds is not None) and beds is None:
+        return False
+    if min_beds is not None and beds < min_beds:
+        return False
+    if max_beds is not None and beds > max_beds:
+        return False
+
+    if types:
+        # tam değer karşılaştırması: "detached" "Semi-Detached" ile eşleşmez
+        wanted = {_norm_type(t) for t in types if t and t.strip()}
+        have = {_norm_type(item.get(k)) for k in ("property_type", "property_subtype", "final_property_type")}
+        if not wanted.intersection(have):
+            return False
+    return True
+
+
+def _norm_type(value: Any) -> str:
+    """'Semi-Detached' / 'semi_detached' / ' semi detached ' -> 'semi detached'"""
+    return " ".join(re.sub(r"[-_]+", " ", str(value or "")).lower().split())
+
+
+# fetch_property_summary'nin başarılı sonuçları (API, planlayıcı, doğrudan çağrılar) buraya eklenir
+_INDEX: Optional[ListingIndex] = ListingIndex()
+
+
+def get_listing_index() -> Optional[ListingIndex]:
+    return _INDEX
+
+
+def set_listing_index(index: Optional[ListingIndex]) -> None:
+    """Varsayılan indeksi değiştirir; None özetlerin indekslenmesini kapatır."""
+    global _INDEX
+    _INDEX = index
@@ -0,0 +1,265 @@
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import heapq
+import math
+import time
+import zlib
+
+from .url_scraper import fetch_property_summary
+
+HOUR = 3600.0
+DAY = 86400.0
+
+# İlan kaldırıldı sayılan durumlar: değişiklik olarak kaydedilir
+GONE_STATUSES = {"error_http_404", "error_http_410"}
+# Bu kadar gün içinde eklenen ilanlar "yeni" sayılır ve daha sık bakılır
+NEW_LISTING_DAYS = 14
+
+
+def _fingerprint(summary: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Değişiklik tespiti için izlenen alanlar: fiyat, indirim bayrağı, eklenme tarihi."""
+    status = summary.get("status")
+    if status in GONE_STATUSES:
+        return ("gone",)
+    hist = summary.get("listing_history") or {}
+    return (summary.get("price"), bool(hist.get("reduced")), hist.get("added"))
+
+
+def _added_age_days(summary: Dict[str, Any], now: float) -> Optional[float]:
+    added = (summary.get("listing_history") or {}).get("added")
+    if not added:
+        return None
+    try:
+        dt = datetime.strptime(str(added)[:8], "%Y%m%d").replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+    return (now - dt.timestamp()) / DAY
+
+
+class RefreshScheduler:
+    """
+    İzleme listesi için uyarlamalı yenileme planlayıcısı.
+    - Her ilanın aralığı değişiklik geçmişine göre ayarlanır: değiştiyse yarıya iner,
+      değişmediyse backoff_factor ile uzar (min_interval..max_interval).
+    - Vadesi gelen ilanlar, son kontrolden beri değişmiş olma olasılığına göre sıralanır
+      (tahmini değişim hızı ile 1 - exp(-rate * geçen_süre)).
+    - Global requests_per_minute bütçesi aşılmaz; istekler 60/rpm saniye arayla yayılır (rpm < 1 dahil).
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 60,
+        min_interval: float = 2 * HOUR,
+        max_interval: float = 14 * DAY,
+        initial_interval: float = DAY,
+        backoff_factor: float = 1.5,
+        clock: Callable[[], float] = time.time,
+    ):
+        if requests_per_minute <= 0:
+            raise ValueError("requests_per_minute must be positive")
+        self.requests_per_minute = requests_per_minute
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.initial_interval = initial_interval
+        self.backoff_factor = backoff_factor
+        self.clock = clock
+        self._items: Dict[str, Dict[str, Any]] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._ready: Dict[str, Dict[str, Any]] = {}
+        # bir sonraki isteğe izin verilen en erken zaman (istekler 60/rpm sn arayla)
+        self._next_slot: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    # --- izleme listesi ---
+    def add(self, url: str, now: Optional[float] = None) -> None:
+        """URL'i izlemeye alır; ilk kontroller initial_interval'e deterministik olarak yayılır."""
+        if url in self._items:
+            return
+        now = self.clock() if now is None else now
+        offset = (zlib.crc32(url.encode("utf-8")) % 10000) / 10000.0 * self.initial_interval
+        item = {
+            "url": url,
+            "interval": self.initial_interval,
+            "next_due": now + offset,
+            "first_seen": now,
+            "last_checked": None,
+            "fingerprint": None,
+            "checks": 0,
+            "changes": 0,
+        }
+        self._items[url] = item
+        heapq.heappush(self._heap, (item["next_due"], url))
+
+    def add_many(self, urls: Iterable[str], now: Optional[float] = None) -> None:
+        for url in urls:
+            self.add(url, now=now)
+
+    def remove(self, url: str) -> None:
+        self._items.pop(url, None)
+        self._ready.pop(url, None)
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        item = self._items.get(url)
+        return dict(item) if item else None
+
+    # --- tahmin ---
+    def _change_rate(self, item: Dict[str, Any]) -> float:
+        """Saniye başına tahmini değişim hızı (gözlem yoksa başlangıç aralığına göre ön kabul)."""
+        observed = (item["last_checked"] or item["first_seen"]) - item["first_seen"]
+        return (item["changes"] + 0.5) / (observed + self.initial_interval)
+
+    def change_probability(self, url: str, now: Optional[float] = None) -> float:
+        item = self._items[url]
+        now = self.clock() if now is None else now
+        since = now - (item["last_checked"] if item["last_checked"] is not None else item["first_seen"] - item["interval"])
+        return 1.0 - math.exp(-self._change_rate(item) * max(0.0, since))
+
+    # --- sonuç kaydı ---
+    def record(self, url: str, summary: Dict[str, Any], now: Optional[float] = None) -> bool:
+        """
+        fetch_property_summary sonucunu işler ve bir sonraki kontrol zamanını belirler.
+        İlk kontrol hariç, izlenen alanlar değiştiyse True döner.
+        """
+        item = self._items.get(url)
+        if item is None:
+            return False
+        now = self.clock() if now is None else now
+        self._ready.pop(url, None)
+
+        status = summary.get("status")
+        if status != "success" and status not in GONE_STATUSES:
+            # geçici hata: tahminleri bozma, kısa süre sonra tekrar dene
+            item["next_due"] = now + self.min_interval
+            heapq.heappush(self._heap, (item["next_due"], url))
+            return False
+
+        fp = _fingerprint(summary)
+        changed = item["fingerprint"] is not None and fp != item["fingerprint"]
+        item["checks"] += 1
+        item["last_checked"] = now
+        item["fingerprint"] = fp
+
+        if fp == ("gone",):
+            interval = self.max_interval
+        elif changed:
+            item["changes"] += 1
+            interval = item["interval"] * 0.5
+        elif item["checks"] > 1:
+            interval = item["interval"] * self.backoff_factor
+        else:
+            interval = item["interval"]
+
+        age = _added_age_days(summary, now)
+        if age is not None and age <= NEW_LISTING_DAYS:
+            # yeni ilanlar ilk haftalarda sık değişir
+            interval = min(interval, self.initial_interval / 4)
+
+        item["interval"] = min(self.max_interval, max(self.min_interval, interval))
+        item["next_due"] = now + item["interval"]
+        heapq.heappush(self._heap, (item["next_due"], url))
+        return changed
+
+    # --- planlama ---
+    def _collect_due(self, now: float) -> None:
+        while self._heap and self._heap[0][0] <= now:
+            due, url = heapq.heappop(self._heap)
+            item = self._items.get(url)
+            # silinmiş ya da yeniden planlanmış eski heap kayıtlarını atla
+            if item is None or item["next_due"] != due:
+                continue
+            self._ready[url] = item
+
+    def plan(self, now: Optional[float] = None, window: float = 60.0) -> List[Tuple[float, str]]:
+        """
+        Önümüzdeki window saniyesi için [(zaman, url)] planı. İstekler 60/rpm saniyelik slotlara
+        yerleşir (kesirli rpm dahil); pencereye düşen slot kadar vadesi gelmiş ilan, değişim
+        olasılığına göre seçilir. Slotlar pencereler arasında devreder, kullanılmayan kapasite birikmez.
+        Seçilmeyenler bekleme havuzunda kalır, öncelikleri zamanla artar.
+        """
+        now = self.clock() if now is None else now
+        self._collect_due(now)
+        if not self._ready:
+            return []
+
+        step = 60.0 / self.requests_per_minute
+        start = now if self._next_slot is None else max(now, self._next_slot)
+        if start >= now + window:
+            return []
+        slots = int((now + window - start) / step) + 1
+        if start + (slots - 1) * step >= now + window:
+            slots -= 1
+
+        ranked = sorted(self._ready, key=lambda u: self.change_probability(u, now), reverse=True)[:slots]
+        self._next_slot = start + len(ranked) * step
+        return [(start + i * step, url) for i, url in enumerate(ranked)]
+
+    def next_due_at(self) -> Optional[float]:
+        """Bir sonraki planın anlamlı olacağı zaman: bekleyen ilan varsa ilk boş slot, yoksa en yakın vade."""
+        slot = self._next_slot if self._next_slot is not None else float("-inf")
+        if self._ready:
+            return max(self.clock(), slot)
+        while self._heap:
+            due, url = self._heap[0]
+            item = self._items.get(url)
+            if item is not None and item["next_due"] == due:
+                return max(due, slot)
+            heapq.heappop(self._heap)
+        return None
+
+    def run(
+        self,
+        fetch: Callable[[str], Dict[str, Any]] = fetch_property_summary,
+        on_result: Optional[Callable[[str, Dict[str, Any], bool], None]] = None,
+        max_requests: Optional[int] = None,
+        window: float = 60.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> int:
+        """
+        Planlayıcı döngüsü: pencere pencere plan yapar, istekleri zamanına kadar bekleyip çeker.
+        max_requests dolunca (verildiyse) yapılan istek sayısıyla döner.
+        """
+        done = 0
+        while max_requests is None or done < max_requests:
+            now = self.clock()
+            schedule = self.plan(now, window=window)
+            if not schedule:
+                nxt = self.next_due_at()
+                if nxt is None:
+                    return done
+                sleep(max(0.0, min(nxt - now, window)))
+                continue
+
+            for at, url in schedule:
+                if max_requests is not None and done >= max_requests:
+                    # kullanılmayan slotları geri ver; sonraki run bunlardan devam eder
+                    self._next_slot = at
+                    break
+                wait = at - self.clock()
+                if wait > 0:
+                    sleep(wait)
+                if url not in self._items:
+                    continue
+                try:
+                    summary = fetch(url)
+                except Exception as e:
+                    # bağlantı/DNS hatası döngüyü durdurmasın: geçici hata olarak kaydedilir
+                    summary = {"url": url, "status": "error_request", "error": str(e)}
+                changed = self.record(url, summary)
+                done += 1
+                if on_result:
+                    on_result(url, summary, changed)
+        return done
+
+    def stats(self) -> Dict[str, Any]:
+        intervals = sorted(it["interval"] for it in self._items.values())
+        n = len(intervals)
+        return {
+            "watched": n,
+            "ready": len(self._ready),
+            "checks": sum(it["checks"] for it in self._items.values()),
+            "changes": sum(it["changes"] for it in self._items.values()),
+            "median_interval_s": intervals[n // 2] if n else None,
+            "requests_per_minute": self.requests_per_minute,
+        }
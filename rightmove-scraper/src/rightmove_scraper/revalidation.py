@@ -0,0 +1,99 @@
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional
+import copy
+import threading
+import time
+
+
+class ValidatorCache:
+    """
+    URL başına doğrulayıcılar (ETag / Last-Modified) + o cevaptan çıkarılmış sonuç.
+    Sonraki isteklerde If-None-Match / If-Modified-Since gönderilir; 304 gelirse
+    saklı sonuç kullanılır, sayfa hiç parse edilmez. LRU ile max_entries'te sınırlı.
+    """
+
+    def __init__(self, max_entries: int = 50000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        if not entry:
+            return {}
+        headers: Dict[str, str] = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, key: str, response_headers: Mapping[str, str], payload: Any) -> bool:
+        """
+        Cevapta doğrulayıcı varsa payload ile birlikte saklar; yoksa eski kaydı siler
+        (eski doğrulayıcılar artık bu içeriği temsil etmez) ve False döner.
+        """
+        etag = response_headers.get("ETag")
+        last_modified = response_headers.get("Last-Modified")
+        if not etag and not last_modified:
+            with self._lock:
+                self._entries.pop(key, None)
+            return False
+        with self._lock:
+            self._entries[key] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "payload": copy.deepcopy(payload),
+                "stored_at": time.time(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    @staticmethod
+    def payload(entry: Dict[str, Any]) -> Any:
+        """Saklı sonucun kopyası (çağıran değiştirse de cache bozulmaz)."""
+        return copy.deepcopy(entry["payload"])
+
+    def record(self, kind: str, outcome: str) -> None:
+        """outcome: hit (304), miss (koşullu istek 200 döndü), uncached (doğrulayıcı yoktu)."""
+        with self._lock:
+            s = self._stats.setdefault(kind, {"hit": 0, "miss": 0, "uncached": 0})
+            s[outcome] = s.get(outcome, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = {"entries": len(self._entries)}
+            for kind, s in self._stats.items():
+                conditional = s["hit"] + s["miss"]
+                out[kind] = dict(
+                    s,
+                    requests=conditional + s["uncached"],
+                    hit_rate=round(s["hit"] / conditional, 3) if conditional else None,
+                )
+            return out
+
+
+_CACHE: Optional[ValidatorCache] = ValidatorCache()
+
+
+def get_validator_cache() -> Optional[ValidatorCache]:
+    return _CACHE
+
+
+def set_validator_cache(cache: Optional[ValidatorCache]) -> None:
+    """Varsayılan cache'i değiştirir; None koşullu istekleri tamamen kapatır."""
+    global _CACHE
+    _CACHE = cache
@@ -1,3 +1,4 @@
+import codecs
 import json
 import re
 import time
@@ -6,6 +7,11 @@ from typing import Any, Dict, List, Optional, Tuple
 import requests
 from bs4 import BeautifulSoup
 
+from .deadline import Deadline, DeadlineExceeded, can_afford, step_timeout
+from .egress import http_get
+from .listing_index import get_listing_index
+from .revalidation import ValidatorCache, get_validator_cache
+
 # Stabil ve ban yemeyi azaltan başlıklar
 HEADERS = {
     "User-Agent": (
@@ -19,30 +25,279 @@ HEADERS = {
 }
 
 
-def _get_html(url: str, timeout: int = 12, retries: int = 2, backoff: float = 1.2) -> Optional[requests.Response]:
-    """Sağlam istek: 403/429/5xx durumlarında kısa retry yapar."""
+def _get_html(
+    url: str,
+    timeout: int = 12,
+    retries: int = 2,
+    backoff: float = 1.2,
+    deadline: Optional[Deadline] = None,
+    extra_headers: Optional[Dict[str, str]] = None,
+    stream: bool = False,
+) -> Optional[requests.Response]:
+    """
+    Sağlam istek: 403/429/5xx durumlarında kısa retry yapar; retry'lar biterse son cevapla döner.
+    extra_headers (ör. If-None-Match) HEADERS'ın üstüne eklenir.
+    deadline verilirse her denemenin timeout'u kalan süreye göre kırpılır; bekleme + yeni deneme
+    sığmıyorsa son cevapla döner, hiç cevap yoksa DeadlineExceeded fırlatır. Gövde de _iter_body
+    ile parça parça, soket timeout'u kalan süreye çekilerek okunur.
+    stream=True: gövde okunmaz, açık cevap döner (okuma ve kapatma çağıranda; bkz. _get_state_streamed).
+    """
+    # havuz ayarlıysa istek havuzdaki bir rotadan çıkar (bkz. egress.set_egress_pool)
     session = requests.Session()
-    session.headers.update(HEADERS)
+    headers = dict(HEADERS, **(extra_headers or {}))
 
     last_exc: Optional[Exception] = None
+    last_resp: Optional[requests.Response] = None
     for attempt in range(retries + 1):
+        if attempt:
+            wait = backoff * attempt
+            if not can_afford(deadline, wait):
+                if last_resp is not None:
+                    return last_resp
+                raise DeadlineExceeded("listing")
+            time.sleep(wait)
+        req_timeout = step_timeout(deadline, timeout, "listing")
         try:
-            resp = session.get(url, timeout=timeout)
+            resp = http_get(url, headers=headers, session=session, timeout=req_timeout, stream=stream or deadline is not None)
+            if deadline is not None and not stream:
+                _read_body(resp, deadline)
             if resp.status_code == 200:
                 return resp
             if resp.status_code in (403, 429, 500, 502, 503, 504):
-                time.sleep(backoff * (attempt + 1))
+                if stream:
+                    resp.close()
+                last_resp = resp
                 continue
             # diğer error kodlarında dön
             return resp
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             last_exc = e
-            time.sleep(backoff * (attempt + 1))
+    if last_resp is not None:
+        return last_resp
     if last_exc:
         raise last_exc
     return None
 
 
+def _iter_body(
+    resp: requests.Response, chunk_size: int, deadline: Optional[Deadline] = None, stage: str = "listing_body"
+):
+    """
+    resp.iter_content gibi; deadline varsa her okumadan önce süre kontrol edilir ve soket
+    timeout'u kalan süreye çekilir (takılan bir okuma da bütçeyi aşamaz). stage: DeadlineExceeded'a yazılır.
+    """
+    it = resp.iter_content(chunk_size=chunk_size)
+    sock = None
+    if deadline is not None:
+        sock = getattr(getattr(resp.raw, "_connection", None), "sock", None)
+    while True:
+        if deadline is not None:
+            left = deadline.remaining()
+            if left <= 0:
+                raise DeadlineExceeded(stage)
+            if sock is not None:
+                sock.settimeout(left)
+        try:
+            chunk = next(it)
+        except StopIteration:
+            return
+        except Exception:
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceeded(stage)
+            raise
+        yield chunk
+
+
+def _read_body(
+    resp: requests.Response, deadline: Deadline, chunk_size: int = 4096, stage: str = "listing_body"
+) -> None:
+    """Stream edilen gövdeyi okur ve resp.content'e yerleştirir; süre biterse bağlantıyı kapatır."""
+    try:
+        body = b"".join(_iter_body(resp, chunk_size, deadline, stage=stage))
+    except DeadlineExceeded:
+        resp.close()
+        raise
+    resp._content = body
+    resp._content_consumed = True
+
+
+# Gömülü state'i taşıyan script işaretleri; state objesi bunlardan hemen sonra başlar
+STATE_MARKERS = (
+    "window.PAGE_MODEL",
+    "window.__PRELOADED_STATE__",
+    "window.__INITIAL_STATE__",
+    "__RMLISTING_STATE__",
+)
+# İçerik anahtarları: stream modunda görülürse ait olduğu <script>'in başına dönülüp obje oradan taranır
+STATE_CONTENT_KEYS = (
+    '"propertyData":',
+    '"analyticsProperty":',
+)
+# Klasik (_extract_state_from_html) yolun aradığı anahtarlar: ikisinin birleşimi
+STATE_KEYS = STATE_MARKERS + STATE_CONTENT_KEYS
+_STREAM_LOOKBEHIND = max(len(m) for m in STATE_KEYS)
+
+_JSON_TOKEN_RE = re.compile(r'[{}"\\]')
+
+
+def _scan_json_object(text: str, scan: Dict[str, Any]) -> Optional[int]:
+    """
+    Dengeli süslü parantez taramasını kaldığı yerden sürdürür (string ve escape farkında).
+    Obje kapandığında bitiş indeksini (exclusive) döndürür, yoksa None.
+    """
+    depth = scan["depth"]
+    in_str = scan["in_str"]
+    skip = scan["skip"]
+    for m in _JSON_TOKEN_RE.finditer(text, scan["pos"]):
+        i = m.start()
+        if i < skip:
+            continue
+        ch = m.group(0)
+        if in_str:
+            if ch == "\\":
+                skip = i + 2
+            elif ch == '"':
+                in_str = False
+            continue
+        if ch == '"':
+            in_str = True
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    scan.update(pos=max(len(text), skip), depth=depth, in_str=in_str, skip=skip)
+    return None
+
+
+def _find_state_start(buf: str, searched: int) -> Tuple[Optional[int], int]:
+    """
+    Tampondaki state objesinin başlangıç '{' indeksini arar.
+    Dönen: (başlangıç ya da None, bir sonraki aramanın başlayacağı indeks)
+    """
+    hits = []
+    for marker in STATE_MARKERS:
+        idx = buf.find(marker, searched)
+        if idx != -1:
+            hits.append((idx, marker, False))
+    for key in STATE_CONTENT_KEYS:
+        idx = buf.find(key, searched)
+        if idx != -1:
+            hits.append((idx, key, True))
+
+    for idx, token, is_content in sorted(hits):
+        if is_content:
+            script = buf.rfind("<script", 0, idx)
+            tag_end = buf.find(">", script) if script != -1 else -1
+            brace = buf.find("{", tag_end, idx) if tag_end != -1 else -1
+            if brace != -1:
+                return brace, idx
+            continue
+        brace = buf.find("{", idx + len(token))
+        if brace != -1:
+            return brace, idx
+        # işaret geldi ama obje henüz gelmedi: bir sonraki chunk'ta buradan ara
+        return None, idx
+
+    # işaret chunk sınırına denk gelebilir; en uzun işaret kadar geride kal
+    return None, max(searched, len(buf) - _STREAM_LOOKBEHIND)
+
+
+def _consume_state_stream(
+    resp: requests.Response, out: Dict[str, Any], chunk_size: int, deadline: Optional[Deadline] = None
+) -> None:
+    """
+    Gövdeyi parça parça okur, state işaretini arar ve obje tamamlanınca okumayı keser.
+    iter_content gzip/deflate içeriği açar; sayaçlar ise kablodan çekilen (sıkıştırılmış) byte'ı ölçer.
+    """
+    decoder = codecs.getincrementaldecoder(resp.encoding or "utf-8")(errors="replace")
+    buf = ""
+    searched = 0
+    json_start: Optional[int] = None
+    scan: Dict[str, Any] = {}
+
+    for chunk in _iter_body(resp, chunk_size, deadline):
+        buf += decoder.decode(chunk)
+
+        if json_start is None:
+            json_start, searched = _find_state_start(buf, searched)
+            if json_start is None:
+                continue
+            scan = {"pos": json_start, "depth": 0, "in_str": False, "skip": 0}
+
+        if json_start >= 0:
+            end = _scan_json_object(buf, scan)
+            if end is not None:
+                try:
+                    state = json.loads(buf[json_start:end])
+                except Exception:
+                    state = None
+                if isinstance(state, dict):
+                    out["state"] = state
+                    out["early_exit"] = True
+                    break
+                # bozuk obje: sayfanın tamamını okuyup klasik yola düş
+                json_start = -1
+
+    out["bytes_read"] = resp.raw.tell() if resp.raw is not None else len(buf.encode("utf-8"))
+    total = _int_or_none(resp.headers.get("Content-Length"))
+    out["bytes_total"] = total
+    if total is not None:
+        out["bytes_saved"] = max(total - out["bytes_read"], 0)
+
+    if out["state"] is None:
+        buf += decoder.decode(b"", final=True)
+        out["state"] = _extract_state_from_html(buf)
+
+
+def _get_state_streamed(
+    url: str,
+    timeout: int = 12,
+    retries: int = 2,
+    backoff: float = 1.2,
+    chunk_size: int = 16384,
+    deadline: Optional[Deadline] = None,
+    extra_headers: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """
+    Sayfayı stream ederek indirir; gömülü state objesi tamamlanınca bağlantıyı kapatır.
+    Dönen dict: status_code, state, bytes_read, bytes_total, bytes_saved, early_exit, headers
+    Retry/deadline/extra_headers _get_html(stream=True) üzerinden işler.
+    """
+    out: Dict[str, Any] = {
+        "status_code": None,
+        "state": None,
+        "bytes_read": 0,
+        "bytes_total": None,
+        "bytes_saved": None,
+        "early_exit": False,
+        "headers": {},
+    }
+    resp = _get_html(
+        url,
+        timeout=timeout,
+        retries=retries,
+        backoff=backoff,
+        deadline=deadline,
+        extra_headers=extra_headers,
+        stream=True,
+    )
+    if resp is None:
+        return out
+    try:
+        out["status_code"] = resp.status_code
+        out["headers"] = resp.headers
+        if resp.status_code == 200:
+            _consume_state_stream(resp, out, chunk_size, deadline=deadline)
+    finally:
+        # erken çıkışta kalan gövde okunmaz; bağlantı havuza dönmeden kapanır
+        resp.close()
+    return out
+
+
 def _extract_first_json_object(script_text: str) -> Optional[dict]:
     """Script içindeki ilk JSON objesini parçalayıp dict döndürmeye çalışır."""
     # Hızlı deneme: dengeli süslü parantez taraması
@@ -80,16 +335,8 @@ def _extract_state_from_html(html: str) -> Optional[dict]:
     soup = BeautifulSoup(html, "lxml")
     scripts = [s.string or "" for s in soup.find_all("script")]
 
-    state_keys = [
-        "window.__PRELOADED_STATE__",
-        "window.__INITIAL_STATE__",
-        "__RMLISTING_STATE__",
-        '"propertyData":',
-        '"analyticsProperty":',
-    ]
-
     for script in scripts:
-        if any(key in script for key in state_keys):
+        if any(key in script for key in STATE_KEYS):
             js = _extract_first_json_object(script)
             if isinstance(js, dict):
                 return js
@@ -207,7 +454,9 @@ def _extract_key_features(property_data: dict) -> List[str]:
     return out
 
 
-def fetch_property_summary(url: str) -> dict:
+def fetch_property_summary(
+    url: str, stream: bool = False, deadline: Optional[Deadline] = None, revalidate: bool = True
+) -> dict:
     """
     Geniş özet:
     - price, bedrooms, bathrooms
@@ -220,6 +469,13 @@ def fetch_property_summary(url: str) -> dict:
     - tenure
     - epc (rating)
     - listing_history (added, reduced)
+
+    stream=True: sayfa parça parça okunur, state bulununca bağlantı kesilir;
+    sonuca transfer (bytes_read, bytes_total, bytes_saved, early_exit) eklenir.
+    deadline: süre biterse status "error_deadline" olur.
+    revalidate: daha önce ETag/Last-Modified ile saklanan URL'ler koşullu istenir;
+    304 gelirse saklı özet "revalidated": True ile döner, sayfa parse edilmez.
+    Başarılı özetler varsayılan ListingIndex'e eklenir (bkz. listing_index.set_listing_index).
     """
     result: Dict[str, Any] = {
         "url": url,
@@ -241,19 +497,80 @@ def fetch_property_summary(url: str) -> dict:
         "key_features": [],
     }
 
-    resp = _get_html(url)
-    if not resp:
-        result["status"] = "error_no_response"
-        return result
-    if resp.status_code != 200:
-        result["status"] = f"error_http_{resp.status_code}"
+    cache = get_validator_cache() if revalidate else None
+    entry = cache.get(url) if cache is not None else None
+    conditional = cache.conditional_headers(entry) if cache is not None else {}
+
+    try:
+        if stream:
+            fetched = _get_state_streamed(url, deadline=deadline, extra_headers=conditional)
+            result["transfer"] = {
+                "bytes_read": fetched["bytes_read"],
+                "bytes_total": fetched["bytes_total"],
+                "bytes_saved": fetched["bytes_saved"],
+                "early_exit": fetched["early_exit"],
+            }
+            if fetched["status_code"] is None:
+                result["status"] = "error_no_response"
+                return result
+            if fetched["status_code"] == 304 and entry:
+                return _revalidated(cache, entry, transfer=result["transfer"])
+            status_code = fetched["status_code"]
+            state = fetched["state"]
+            resp_headers = fetched["headers"]
+        else:
+            resp = _get_html(url, deadline=deadline, extra_headers=conditional)
+            if resp is None:
+                result["status"] = "error_no_response"
+                return result
+            if resp.status_code == 304 and entry:
+                return _revalidated(cache, entry)
+            status_code = resp.status_code
+            state = _extract_state_from_html(resp.text) if status_code == 200 else None
+            resp_headers = resp.headers
+    except DeadlineExceeded:
+        result["status"] = "error_deadline"
         return result
 
-    state = _extract_state_from_html(resp.text)
+    # 304 dışındaki her cevap sayılır (hata ve state'siz sayfalar dahil), yoksa hit oranı şişer
+    if cache is not None:
+        cache.record("listing", "miss" if entry else "uncached")
+
+    if status_code != 200:
+        result["status"] = f"error_http_{status_code}"
+        return result
     if not isinstance(state, dict):
         result["status"] = "error_no_state"
         return result
 
+    _fill_summary(result, state)
+
+    if cache is not None:
+        cache.store(url, resp_headers, {k: v for k, v in result.items() if k != "transfer"})
+    _index(result)
+    return result
+
+
+def _revalidated(cache: ValidatorCache, entry: Dict[str, Any], transfer: Optional[Dict[str, Any]] = None) -> dict:
+    """304: saklı özeti döndürür."""
+    cache.record("listing", "hit")
+    result = cache.payload(entry)
+    result["revalidated"] = True
+    if transfer is not None:
+        result["transfer"] = transfer
+    _index(result)
+    return result
+
+
+def _index(result: Dict[str, Any]) -> None:
+    """Özeti varsayılan indekse ekler (indeks kapalıysa bir şey yapmaz)."""
+    index = get_listing_index()
+    if index is not None:
+        index.add(result)
+
+
+def _fill_summary(result: Dict[str, Any], state: dict) -> None:
+    """State JSON'undan özet alanlarını result içine yazar."""
     property_data = state.get("propertyData", {}) if isinstance(state, dict) else {}
     ap = state.get("analyticsInfo", {}).get("analyticsProperty", {}) if isinstance(state, dict) else {}
 
@@ -321,4 +638,3 @@ def fetch_property_summary(url: str) -> dict:
     result["listing_history"] = _extract_listing_history(state)
     result["key_features"] = _extract_key_features(property_data)
 
-    return result
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# src klasörünü import yoluna ekle (main.py ile aynı yaklaşım)
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
@@ -0,0 +1,51 @@
+from rightmove_scraper.address_matcher import best_matches, match_addresses, normalize_address
+from rightmove_scraper.address_search import _pick_best_match
+
+CANDIDATES = [
+    {"displayName": "High Street, London N1", "type": "STREET", "id": 1},
+    {"displayName": "N1 1AA", "type": "POSTCODE", "id": 2},
+    {"displayName": "N1", "type": "OUTCODE", "id": 3},
+    {"displayName": "High Street, Bristol BS1", "type": "STREET", "id": 5},
+]
+
+
+def test_normalize_messy_row():
+    n = normalize_address("Flat 3, 12 High St London N11AA")
+    assert n["postcode"] == "N1 1AA"
+    assert n["outcode"] == "N1"
+    assert n["tokens"] == ("high", "street", "london")
+    assert n["numbers"] == ("12",)
+    assert n["kind"] == "STREET"
+
+    n = normalize_address("Ground Floor Flat, 12 High St, N1 1AA")
+    assert n["tokens"] == ("high", "street")
+    assert n["numbers"] == ("12",)
+
+    n = normalize_address("1st Floor Flat 2B, 40 Mill Lane")
+    assert n["tokens"] == ("mill", "lane")
+    assert n["numbers"] == ("40",)
+
+
+def test_type_choice_follows_query_shape():
+    res = match_addresses(["n1 1aa", "N1", "12 High St London N1 2BB", "high st bristol"], CANDIDATES)
+    assert [r["locationIdentifier"] for r in res] == ["POSTCODE^2", "OUTCODE^3", "STREET^1", "STREET^5"]
+
+
+def test_house_number_breaks_ties():
+    cands = [
+        {"displayName": "10 Mill Lane, Leeds", "type": "STREET", "id": 10},
+        {"displayName": "12 Mill Lane, Leeds", "type": "STREET", "id": 12},
+    ]
+    assert match_addresses(["12 Mill Ln Leeds"], cands)[0]["id"] == "12"
+
+
+def test_pick_best_match_keeps_contract():
+    best = _pick_best_match("n1 1aa", CANDIDATES)
+    assert best == {"name": "N1 1AA", "type": "POSTCODE", "id": "2", "locationIdentifier": "POSTCODE^2"}
+
+
+def test_best_matches_falls_back_to_first_candidate():
+    res = best_matches(["12 High St N1", "Rose Cottage"], CANDIDATES)
+    assert res[0]["locationIdentifier"] == "STREET^1"
+    assert res[1]["locationIdentifier"] == "STREET^1" and res[1]["score"] == 0.0
+    assert best_matches(["N1"], []) == [None]
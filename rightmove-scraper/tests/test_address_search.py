@@ -0,0 +1,74 @@
+from rightmove_scraper import address_search
+
+CARDS = [
+    {"url": "https://www.rightmove.co.uk/properties/1", "address": "Baker Street, London NW1"},
+    {"url": "https://www.rightmove.co.uk/properties/2", "address": "12 High Street, London N1"},
+]
+
+
+def _offline(monkeypatch, cards=CARDS):
+    calls = {"typeahead": 0, "search": 0, "fallback": 0}
+
+    def fake_typeahead(q, timeout=10, deadline=None):
+        calls["typeahead"] += 1
+        yield [{"displayName": "London N1", "type": "OUTCODE", "id": "1"}]
+
+    def fake_search(location_identifier, timeout=12, index=0, deadline=None):
+        calls["search"] += 1
+        return list(cards)
+
+    def fake_fallback(q, timeout=12, deadline=None):
+        calls["fallback"] += 1
+        return list(cards)
+
+    monkeypatch.setattr(address_search, "_typeahead_results", fake_typeahead)
+    monkeypatch.setattr(address_search, "_fetch_search_cards", fake_search)
+    monkeypatch.setattr(address_search, "_search_html_cards", fake_fallback)
+    return calls
+
+
+def test_parse_search_cards_dedupes_links():
+    html = (
+        '<div class="propertyCard"><a class="propertyCard-link" href="/properties/2"></a>'
+        '<a class="propertyCard-link" href="/properties/2"></a><address>12 High Street, London N1</address></div>'
+    )
+    assert address_search._parse_search_cards(html) == [CARDS[1]]
+
+
+def test_pick_card_threshold():
+    assert address_search._pick_card("Flat 1, 12 High St, N1", CARDS)[0] == CARDS[1]["url"]
+    assert address_search._pick_card("5 Rose Lane, Truro TR1", CARDS)[0] is None
+    # adres verilmezse eski davranış: ilk kart
+    assert address_search._pick_card(None, CARDS)[0] == CARDS[0]["url"]
+
+
+def test_pick_card_area_queries_skip_threshold():
+    # sokak/numara sinyali olmayan sorgular kartlarla örtüşmez; eşik uygulanmaz
+    assert address_search._pick_card("SW1A 1AA", CARDS)[0] == CARDS[0]["url"]
+    assert address_search._pick_card("Camden", CARDS)[0] == CARDS[0]["url"]
+    assert address_search._pick_card("London N1", CARDS)[0] == CARDS[1]["url"]
+
+
+def test_bulk_groups_and_marks_unmatched(monkeypatch):
+    calls = _offline(monkeypatch)
+    out = address_search.find_listing_urls_bulk(
+        ["Flat 1, 12 High St, N1", "Flat 2 12 high street N1", "5 Rose Lane, Truro TR1", ""]
+    )
+    res = out["results"]
+    assert [r["status"] for r in res] == ["matched", "matched", "unmatched", "not_found"]
+    assert res[0]["url"] == res[1]["url"] == CARDS[1]["url"]
+    assert res[2]["url"] is None
+    assert {r["locationIdentifier"] for r in res[:3]} == {"OUTCODE^1"}
+    # aynı anahtarlı iki satır tek typeahead'le skorlanır; tek grup → tek sayfa; unmatched için fallback yok
+    assert calls == {"typeahead": 2, "search": 1, "fallback": 0}
+    assert out["stats"]["autocomplete_calls"] == 2
+    assert out["stats"]["groups"] == 1
+
+
+def test_resolve_address_unmatched(monkeypatch):
+    _offline(monkeypatch)
+    found = address_search.resolve_address("5 Rose Lane, Truro TR1")
+    assert found["status"] == "unmatched"
+    assert found["url"] is None
+    assert address_search.find_listing_url_with_fallback("5 Rose Lane, Truro TR1") is None
+    assert address_search.find_listing_url_with_fallback("12 High St N1") == CARDS[1]["url"]
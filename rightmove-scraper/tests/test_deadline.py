@@ -0,0 +1,72 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from rightmove_scraper import address_search, url_scraper
+from rightmove_scraper.deadline import Deadline, DeadlineExceeded
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/ban"):
+            self.send_response(429)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        # /drip: başlıklar hemen, gövde 0.2 sn aralıklarla ~4 sn boyunca
+        self.send_response(200)
+        self.send_header("Content-Length", str(20 * 1024))
+        self.end_headers()
+        try:
+            for _ in range(20):
+                self.wfile.write(b"x" * 1024)
+                self.wfile.flush()
+                time.sleep(0.2)
+        except OSError:
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+
+
+def test_exhausted_retries_return_last_response(server):
+    resp = url_scraper._get_html(server + "/ban", retries=2, backoff=0)
+    assert resp is not None and resp.status_code == 429
+    out = url_scraper._get_state_streamed(server + "/ban", retries=2, backoff=0)
+    assert out["status_code"] == 429
+
+
+def test_summary_reports_http_status_after_retries(server, monkeypatch):
+    monkeypatch.setattr(url_scraper.time, "sleep", lambda s: None)
+    data = url_scraper.fetch_property_summary(server + "/ban", revalidate=False)
+    assert data["status"] == "error_http_429"
+
+
+def test_plain_body_read_is_bounded_by_deadline(server):
+    t0 = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        url_scraper._get_html(server + "/drip", deadline=Deadline(1.5))
+    assert time.monotonic() - t0 < 2.5
+
+
+def test_summary_reports_deadline(server):
+    data = url_scraper.fetch_property_summary(server + "/drip", deadline=Deadline(1.5), revalidate=False)
+    assert data["status"] == "error_deadline"
+
+
+def test_search_page_body_is_bounded_by_deadline(server):
+    t0 = time.monotonic()
+    with pytest.raises(DeadlineExceeded) as exc:
+        address_search._get_search_cards(server + "/drip", timeout=10, deadline=Deadline(1.5))
+    assert exc.value.stage == "search"
+    assert time.monotonic() - t0 < 2.5
@@ -0,0 +1,127 @@
+import random
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from rightmove_scraper import url_scraper
+from rightmove_scraper.egress import EgressPool, EgressRoute, set_egress_pool
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+
+def _pool(*routes, **kwargs):
+    clock = FakeClock()
+    return EgressPool(list(routes), clock=clock, rng=random.Random(7), **kwargs), clock
+
+
+def test_ban_cooldown_doubles_and_resets():
+    a, b = EgressRoute("a"), EgressRoute("b")
+    pool, clock = _pool(a, b, cooldown=10.0, max_cooldown=25.0)
+
+    pool.report(a, status_code=429)
+    assert a.cooldown_until == clock.t + 10.0
+    assert all(pool.pick() is b for _ in range(20))
+
+    clock.t = a.cooldown_until
+    pool.report(a, status_code=403)
+    assert a.cooldown_until == clock.t + 20.0
+    clock.t = a.cooldown_until
+    pool.report(a, status_code=429)
+    # 40 sn olurdu, max_cooldown'da kırpılır
+    assert a.cooldown_until == clock.t + 25.0
+
+    clock.t = a.cooldown_until
+    pool.report(a, status_code=200)
+    assert a.consecutive_bans == 0
+    pool.report(a, status_code=429)
+    assert a.cooldown_until == clock.t + 10.0
+
+
+def test_consecutive_failures_trigger_cooldown():
+    a, b = EgressRoute("a"), EgressRoute("b")
+    pool, clock = _pool(a, b, cooldown=10.0)
+    pool.report(a, status_code=503)
+    pool.report(a, error=OSError("reset"))
+    assert a.cooldown_until == 0.0
+    pool.report(a, status_code=502)
+    assert a.cooldown_until == clock.t + 10.0
+
+
+def test_all_routes_cooling_picks_earliest_recovery():
+    a, b = EgressRoute("a"), EgressRoute("b")
+    pool, clock = _pool(a, b, cooldown=10.0)
+    pool.report(a, status_code=429)
+    pool.report(a, status_code=429)
+    pool.report(b, status_code=429)
+    assert pool.pick() is b
+
+
+def test_pick_is_weighted_by_score():
+    fast, slow = EgressRoute("fast"), EgressRoute("slow", weight=0.5)
+    pool, _ = _pool(fast, slow)
+    pool.report(fast, status_code=200, latency=0.2)
+    pool.report(slow, status_code=200, latency=0.8)
+    # skorlar 5.0 ve 0.625: beklenen oran ~8:1
+    counts = Counter(pool.pick().name for _ in range(4000))
+    assert 6.5 < counts["fast"] / counts["slow"] < 10
+
+
+class _ProxyHandler(BaseHTTPRequestHandler):
+    """Proxy taklidi: path tam URL olarak gelir; status sunucuya göre sabit."""
+
+    def do_GET(self):
+        body = b"<html>ok</html>" if self.server.status == 200 else b""
+        self.server.hits.append(self.path)
+        self.send_response(self.server.status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _proxy(status):
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _ProxyHandler)
+    srv.status = status
+    srv.hits = []
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+@pytest.fixture
+def proxies():
+    banned, healthy = _proxy(429), _proxy(200)
+    yield banned, healthy
+    set_egress_pool(None)
+    banned.shutdown()
+    healthy.shutdown()
+
+
+def test_banned_proxy_is_cooled_down_and_traffic_moves(proxies):
+    banned, healthy = proxies
+    bad = EgressRoute.from_proxy(f"http://127.0.0.1:{banned.server_address[1]}")
+    good = EgressRoute.from_proxy(f"http://127.0.0.1:{healthy.server_address[1]}", weight=0.01)
+    pool, clock = _pool(bad, good, cooldown=60.0)
+    # ilk seçim neredeyse kesin bad (ağırlık 100:1), 429 sonrası good'a geçilmeli
+    set_egress_pool(pool)
+
+    url = "http://listing.test/properties/1"
+    resp = url_scraper._get_html(url, retries=2, backoff=0)
+    assert resp.status_code == 200
+    assert banned.hits == [url]
+    assert healthy.hits == [url]
+    assert bad.bans == 1 and bad.cooldown_until == clock.t + 60.0
+
+    for _ in range(5):
+        assert url_scraper._get_html(url, retries=0).status_code == 200
+    assert len(banned.hits) == 1
+    assert len(healthy.hits) == 6
@@ -0,0 +1,83 @@
+import json
+
+from rightmove_scraper import url_scraper
+from rightmove_scraper.listing_index import ListingIndex, get_listing_index, set_listing_index
+
+
+def _listing(url, lat, lon, price=300000, beds=2, ptype="House", subtype=None):
+    return {
+        "url": url,
+        "status": "success",
+        "price": price,
+        "bedrooms": beds,
+        "property_type": ptype,
+        "property_subtype": subtype,
+        "final_property_type": f"{subtype} {ptype}" if subtype else ptype,
+        "location": {"lat": lat, "lon": lon},
+    }
+
+
+def _index():
+    idx = ListingIndex()
+    idx.add(_listing("detached", 51.500, -0.100, subtype="Detached"))
+    idx.add(_listing("semi", 51.501, -0.100, subtype="Semi-Detached"))
+    idx.add(_listing("terraced", 51.502, -0.100, subtype="Terraced"))
+    idx.add(_listing("end", 51.503, -0.100, subtype="End of Terrace"))
+    idx.add(_listing("flat", 51.504, -0.100, price=900000, beds=1, ptype="Flat"))
+    idx.add(_listing("far", 52.500, -0.100, subtype="Detached"))
+    idx.add({"url": "error", "status": "error_no_state", "location": {"lat": 51.5, "lon": -0.1}})
+    return idx
+
+
+def _urls(rows):
+    return [r["url"] for r in rows]
+
+
+def test_radius_sorted_by_distance():
+    rows = _index().nearby(51.500, -0.100, 1000)
+    assert _urls(rows) == ["detached", "semi", "terraced", "end", "flat"]
+    assert rows[0]["distance_m"] == 0.0
+
+
+def test_types_match_whole_values():
+    idx = _index()
+    assert _urls(idx.nearby(51.5, -0.1, 1000, types=["detached"])) == ["detached"]
+    assert _urls(idx.nearby(51.5, -0.1, 1000, types=["semi-detached"])) == ["semi"]
+    assert _urls(idx.nearby(51.5, -0.1, 1000, types=["terraced"])) == ["terraced"]
+    assert _urls(idx.nearby(51.5, -0.1, 1000, types=["end of terrace", "flat"])) == ["end", "flat"]
+
+
+def test_price_beds_and_bbox():
+    idx = _index()
+    assert _urls(idx.nearby(51.5, -0.1, 1000, min_price=500000)) == ["flat"]
+    assert _urls(idx.nearby(51.5, -0.1, 1000, min_beds=2, max_beds=2, max_price=300000)) == [
+        "detached", "semi", "terraced", "end"
+    ]
+    assert set(_urls(idx.within_bbox(51.4995, -0.101, 51.5015, -0.099))) == {"detached", "semi"}
+
+
+class _FakeResponse:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, state):
+        self.text = "<html><script>window.PAGE_MODEL = " + json.dumps(state) + "</script></html>"
+
+
+def test_fetched_summaries_reach_default_index(monkeypatch):
+    state = {
+        "propertyData": {"bedrooms": 2, "propertySubType": "Flat"},
+        "analyticsInfo": {"analyticsProperty": {"price": 350000, "latitude": 51.5, "longitude": -0.1}},
+    }
+    monkeypatch.setattr(url_scraper, "_get_html", lambda url, **kw: _FakeResponse(state))
+    previous = get_listing_index()
+    idx = ListingIndex()
+    set_listing_index(idx)
+    try:
+        url_scraper.fetch_property_summary("https://www.rightmove.co.uk/properties/9", revalidate=False)
+        assert _urls(idx.nearby(51.5, -0.1, 100)) == ["https://www.rightmove.co.uk/properties/9"]
+        set_listing_index(None)
+        assert url_scraper.fetch_property_summary("https://www.rightmove.co.uk/properties/10", revalidate=False)["status"] == "success"
+        assert len(idx) == 1
+    finally:
+        set_listing_index(previous)
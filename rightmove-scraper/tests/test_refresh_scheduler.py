@@ -0,0 +1,83 @@
+import pytest
+
+from rightmove_scraper.refresh_scheduler import RefreshScheduler
+
+
+class FakeClock:
+    def __init__(self, t=1_700_000_000.0):
+        self.t = t
+        self.sleeps = []
+
+    def __call__(self):
+        return self.t
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.t += seconds
+
+
+def _ok(url):
+    return {"status": "success", "price": 250000, "listing_history": {}}
+
+
+def _scheduler(rpm, clock, n_urls):
+    sched = RefreshScheduler(requests_per_minute=rpm, initial_interval=60.0, min_interval=60.0, clock=clock)
+    sched.add_many([f"u{i}" for i in range(n_urls)])
+    # ilk dalga: hepsinin vadesi gelsin
+    clock.t += 60.0
+    return sched
+
+
+@pytest.mark.parametrize("rpm", [0.5, 1.5, 60])
+def test_fractional_rpm_is_honoured(rpm):
+    clock = FakeClock()
+    sched = _scheduler(rpm, clock, n_urls=200)
+    times = []
+    done = sched.run(fetch=lambda u: times.append(clock.t) or _ok(u), max_requests=100, sleep=clock.sleep)
+    assert done == 100
+    # 100 istek tam olarak 99 aralık sürer: int() yuvarlaması ya da boşta dönme yok
+    assert times[-1] - times[0] == pytest.approx(99 * 60.0 / rpm)
+    assert all(s > 0 for s in clock.sleeps)
+
+
+def test_unused_slots_are_returned():
+    clock = FakeClock()
+    sched = _scheduler(60, clock, n_urls=50)
+    times = []
+    for _ in range(10):
+        sched.run(fetch=lambda u: times.append(clock.t) or _ok(u), max_requests=1, sleep=clock.sleep)
+    assert [b - a for a, b in zip(times, times[1:])] == [1.0] * 9
+
+
+def test_plan_carries_slots_across_windows():
+    clock = FakeClock()
+    sched = RefreshScheduler(requests_per_minute=0.5, initial_interval=60.0, clock=clock)
+    sched.add_many(["a", "b", "c"])
+    clock.t += 60.0
+    first = sched.plan(window=60.0)
+    assert len(first) == 1
+    # bir sonraki slot 120 sn sonra: bu pencerede yer yok, bekleme zamanı slotu gösterir
+    assert sched.plan(window=60.0) == []
+    assert sched.next_due_at() == pytest.approx(first[0][0] + 120.0)
+
+
+def test_fetch_errors_are_retried_later():
+    clock = FakeClock()
+    sched = _scheduler(60, clock, n_urls=2)
+    seen = []
+
+    def fetch(url):
+        raise ConnectionError(f"cannot reach {url}")
+
+    done = sched.run(fetch=fetch, on_result=lambda u, s, c: seen.append(s["status"]), max_requests=2, sleep=clock.sleep)
+    assert done == 2
+    assert seen == ["error_request", "error_request"]
+    for url in ("u0", "u1"):
+        item = sched.get(url)
+        assert item["checks"] == 0
+        assert item["next_due"] == pytest.approx(clock.t + sched.min_interval, abs=2.0)
+
+
+def test_invalid_rate_rejected():
+    with pytest.raises(ValueError):
+        RefreshScheduler(requests_per_minute=0)
@@ -0,0 +1,124 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from rightmove_scraper import address_search, url_scraper
+from rightmove_scraper.revalidation import ValidatorCache, get_validator_cache, set_validator_cache
+
+STATE = {
+    "propertyData": {"bedrooms": 2},
+    "analyticsInfo": {"analyticsProperty": {"price": 400000, "displayAddress": "12 High Street, London N1"}},
+}
+CARDS_HTML = (
+    '<div class="propertyCard"><a class="propertyCard-link" href="/properties/7"></a>'
+    "<address>12 High Street, London N1</address></div>"
+)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """ETag'li sayfalar; If-None-Match güncel sürümle eşleşirse 304."""
+
+    def do_GET(self):
+        srv = self.server
+        srv.requests.append((self.path, self.headers.get("If-None-Match")))
+        path = self.path.split("?")[0]
+        if path == "/missing":
+            self._send(404, b"")
+            return
+        etag = f'"{path}-{srv.version}"'
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, b"")
+            return
+        if path == "/search":
+            body = CARDS_HTML.encode("utf-8")
+        elif path == "/nostate":
+            body = b"<html><body>no state here</body></html>"
+        else:
+            state = dict(STATE, analyticsInfo={"analyticsProperty": dict(STATE["analyticsInfo"]["analyticsProperty"], price=400000 + srv.version)})
+            body = f"<html><script>window.PAGE_MODEL = {json.dumps(state)}</script></html>".encode("utf-8")
+        self._send(200, body, etag=etag)
+
+    def _send(self, status, body, etag=None):
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    srv.version = 1
+    srv.requests = []
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv, f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+
+
+@pytest.fixture
+def cache():
+    previous = get_validator_cache()
+    fresh = ValidatorCache()
+    set_validator_cache(fresh)
+    yield fresh
+    set_validator_cache(previous)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_listing_304_serves_stored_summary(server, cache, stream):
+    srv, base = server
+    url = base + "/listing"
+    first = url_scraper.fetch_property_summary(url, stream=stream)
+    assert first["status"] == "success" and first["price"] == 400001
+    assert "revalidated" not in first
+
+    second = url_scraper.fetch_property_summary(url, stream=stream)
+    assert srv.requests[-1] == ("/listing", '"/listing-1"')
+    assert second["revalidated"] is True
+    assert second["price"] == 400001
+    assert ("transfer" in second) is stream
+
+    # içerik değişti: 200 yeni özetle döner ve cache güncellenir
+    srv.version = 2
+    third = url_scraper.fetch_property_summary(url, stream=stream)
+    assert "revalidated" not in third and third["price"] == 400002
+    assert cache.get(url)["etag"] == '"/listing-2"'
+
+    assert cache.stats()["listing"] == {"hit": 1, "miss": 1, "uncached": 1, "requests": 3, "hit_rate": 0.5}
+
+
+def test_search_cards_304_serves_stored_cards(server, cache):
+    srv, base = server
+    url = base + "/search?locationIdentifier=OUTCODE%5E1"
+    cards = address_search._get_search_cards(url, timeout=5)
+    assert cards == [{"url": "https://www.rightmove.co.uk/properties/7", "address": "12 High Street, London N1"}]
+    assert address_search._get_search_cards(url, timeout=5) == cards
+    assert srv.requests[-1][1] == '"/search-1"'
+    assert cache.stats()["search"]["hit"] == 1
+    assert cache.stats()["search"]["uncached"] == 1
+
+
+def test_failed_and_stateless_responses_are_counted(server, cache):
+    srv, base = server
+    url = base + "/nostate"
+    assert url_scraper.fetch_property_summary(url)["status"] == "error_no_state"
+    # state'siz sayfa saklanmaz: sonraki istek koşulsuz gider
+    assert url_scraper.fetch_property_summary(url)["status"] == "error_no_state"
+    assert srv.requests[-1] == ("/nostate", None)
+    assert url_scraper.fetch_property_summary(base + "/missing")["status"] == "error_http_404"
+    assert cache.stats()["listing"]["uncached"] == 3
+
+
+def test_response_without_validators_evicts_entry(cache):
+    cache.store("u", {"ETag": '"a"'}, {"price": 1})
+    assert cache.conditional_headers(cache.get("u")) == {"If-None-Match": '"a"'}
+    assert cache.store("u", {}, {"price": 2}) is False
+    assert cache.get("u") is None
+    assert len(cache) == 0
@@ -0,0 +1,84 @@
+import json
+
+from rightmove_scraper.url_scraper import _consume_state_stream, _extract_state_from_html
+
+STATE = {
+    "propertyData": {"bedrooms": 3, "text": "brace } \" { inside"},
+    "analyticsInfo": {"analyticsProperty": {"price": 450000}},
+}
+
+
+class _FakeRaw:
+    def __init__(self):
+        self.read = 0
+
+    def tell(self):
+        return self.read
+
+
+class _FakeStream:
+    """requests.Response yerine: gövdeyi sabit boyutlu chunk'lar halinde verir, okunan byte'ı sayar."""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.encoding = "utf-8"
+        self.raw = _FakeRaw()
+        self.headers = {"Content-Length": str(len(body))}
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.body), chunk_size):
+            chunk = self.body[i : i + chunk_size]
+            self.raw.read += len(chunk)
+            yield chunk
+
+
+def _page(script: str) -> bytes:
+    head = "<html><head>" + "<meta name='x'>" * 500 + "</head><body>"
+    tail = "<div class='filler'>listing</div>" * 6000 + "</body></html>"
+    return (head + script + tail).encode("utf-8")
+
+
+def _consume(body: bytes, chunk_size: int = 4096) -> dict:
+    out = {"status_code": 200, "state": None, "bytes_read": 0, "bytes_total": None, "bytes_saved": None, "early_exit": False}
+    _consume_state_stream(_FakeStream(body), out, chunk_size)
+    return out
+
+
+def test_page_model_marker_exits_early():
+    body = _page("<script>window.PAGE_MODEL = " + json.dumps(STATE) + "</script>")
+    assert len(body) > 200_000
+    out = _consume(body)
+    assert out["state"] == STATE == _extract_state_from_html(body.decode())
+    assert out["early_exit"] is True
+    assert out["bytes_saved"] > 150_000
+
+
+def test_stream_and_full_parse_share_markers():
+    # içerik anahtarı olmayan PAGE_MODEL: iki yol da sadece işaretle bulabilir
+    model = {"pageTitle": "listing", "id": 1}
+    body = _page("<script>window.PAGE_MODEL = " + json.dumps(model) + "</script>")
+    assert _consume(body)["state"] == model == _extract_state_from_html(body.decode())
+
+
+def test_content_key_scans_from_script_start():
+    # bilinen bir window.* işareti yok; sadece "propertyData": anahtarı var
+    body = _page("<script type='text/javascript'>var model = " + json.dumps(STATE) + ";</script>")
+    out = _consume(body, chunk_size=1000)
+    assert out["state"] == STATE
+    assert out["early_exit"] is True
+    assert out["bytes_saved"] > 150_000
+
+
+def test_marker_split_across_chunks():
+    body = _page("<script>window.__PRELOADED_STATE__ = " + json.dumps(STATE) + "</script>")
+    for chunk_size in (7, 13, 64):
+        out = _consume(body, chunk_size=chunk_size)
+        assert out["state"] == STATE
+        assert out["early_exit"] is True
+
+
+def test_no_state_falls_back_to_full_parse():
+    out = _consume(_page("<script>var x = 1;</script>"))
+    assert out["state"] is None
+    assert out["early_exit"] is False
+    assert out["bytes_saved"] == 0